@@ -0,0 +1,319 @@
+"""CSC111 Winter 2023 Course Project: Batch
+
+Instructions
+===============================
+
+This Python module is the non-interactive entry point of the simulation, for running many scenarios
+on machines without a display or a user. Run it with
+
+    python batch.py scenarios.toml [--summary summary.csv] [--quiet]
+
+A scenario file (JSON, TOML or CSV) lists the scenarios, and each scenario is run once for every one of its seeds.
+A scenario has the following fields:
+
+- name: the name of the scenario, used in the summary and in the output paths
+- dataset: the path of the dataset, as in main.DATASET
+- engine: one of ensemble.ENSEMBLE_ENGINES ('count' by default)
+- seeds: a list of seeds (or one seed), every run is reproducible from its seed as in ensemble.run_replicate
+- first_state: the name of the first infected state (a random state chosen with the seed by default)
+- policies: a dictionary mapping state names to their isolation index, maskwearing index, vaccination index
+  and lockdown status, in the same format as returned by simulations.get_user_input
+- outputs: a dictionary mapping the outputs to save to their paths, where {name} and {seed} are replaced by the
+  name of the scenario and the seed: 'edges' (the connections, in the format of edges.EdgeWriter),
+  'recording' (the Recorder of the run, see Recorder.save) and 'plot' (the map, see plotter.plot_diagram)
+
+A JSON or TOML file has a list of scenarios under the key "scenarios" (a [[scenarios]] table in TOML),
+and may have a "defaults" table with the fields shared by every scenario. A CSV file has one row per scenario
+and state policy, with the columns name, dataset, engine, seeds (separated by spaces), first_state,
+state, isolation, maskwearing, vaccination, lockdown, edges, recording and plot; the rows with the same name
+are one scenario, whose other fields are taken from its first row.
+Relative paths are relative to the folder of the scenario file.
+
+Every dataset is read once, however many scenarios use it, and plotly is only imported when a plot
+is saved, so a batch without plots starts quickly.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import csv
+import json
+import os
+import random
+import sys
+from typing import Any, Optional, Union
+
+from edges import EDGE_FIELDS, EdgeWriter
+from ensemble import ENSEMBLE_ENGINES
+from graph import InfectedZones
+from recorder import Recorder
+from simulations import ENGINES, apply_policies, get_edge_rows, populate_states, read_dataset
+from vectorized import VectorizedZones
+
+# The fields of a scenario
+SCENARIO_FIELDS = ('name', 'dataset', 'engine', 'seeds', 'first_state', 'policies', 'outputs')
+# The outputs a scenario can save
+OUTPUTS = ('edges', 'recording', 'plot')
+# The columns of a CSV scenario file
+CSV_FIELDS = ('name', 'dataset', 'engine', 'seeds', 'first_state', 'state', 'isolation', 'maskwearing',
+              'vaccination', 'lockdown') + OUTPUTS
+# The columns of the summary of every run
+SUMMARY_FIELDS = ('name', 'seed', 'engine', 'first_state', 'days', 'infected_states', 'edges',
+                  'susceptible', 'infective', 'removed')
+
+
+def load_scenarios(path: str) -> list[dict[str, Any]]:
+    """Return the scenarios in the scenario file with the given path, with every field filled in
+    and the relative paths made absolute.
+
+    Raise a ValueError if the file is not a JSON, TOML or CSV file, or if a scenario is not valid.
+
+    Preconditions:
+        - path is a valid path to the file
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as file:
+            data = json.load(file)
+    elif extension == '.toml':
+        import tomllib
+        with open(path, 'rb') as file:
+            data = tomllib.load(file)
+    elif extension == '.csv':
+        data = _read_csv_scenarios(path)
+    else:
+        raise ValueError(f'{path} is not a JSON, TOML or CSV scenario file')
+
+    if isinstance(data, list):
+        data = {'scenarios': data}
+    defaults = data.get('defaults', {})
+    folder = os.path.dirname(os.path.abspath(path))
+    return [_complete_scenario({**defaults, **scenario,
+                                'outputs': {**defaults.get('outputs', {}), **scenario.get('outputs', {})}}, folder)
+            for scenario in data.get('scenarios', [])]
+
+
+def run_scenario(scenario: dict[str, Any], seed: int,
+                 rows: Optional[list[list[str]]] = None) -> dict[str, Union[str, int, float]]:
+    """Run the given scenario with the given seed, save its outputs, and return its summary,
+    a dictionary mapping every field in SUMMARY_FIELDS to its value.
+    rows are the rows of the dataset of the scenario returned by simulations.read_dataset,
+    the dataset is read if they are not given.
+    Without a first state, the run is the same as ensemble.run_replicate with the same dataset, seed,
+    engine and policies.
+
+    Preconditions:
+        - scenario was returned by load_scenarios
+    """
+    engine = scenario['engine']
+    random.seed(seed)
+    states, keys = populate_states(scenario['dataset'] if rows is None else rows,
+                                   engine=engine if engine in ENGINES else 'count')
+    outputs = {output: path.format(name=scenario['name'], seed=seed) for output, path in scenario['outputs'].items()}
+    for path in outputs.values():
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    recorder = Recorder(keys, fractional=engine == 'mean_field') if 'recording' in outputs else None
+    infected_zones = InfectedZones(states, keys, recorder=recorder if engine in ENGINES else None)
+    if scenario['policies']:
+        apply_policies(infected_zones, scenario['policies'])
+    first_state = scenario['first_state'] if scenario['first_state'] is not None else random.choice(keys)
+
+    zones: Union[InfectedZones, VectorizedZones]
+    if engine in ENGINES:
+        zones = infected_zones
+    else:
+        zones = VectorizedZones(states, keys, seed=seed, mode='ceil' if engine == 'vectorized' else engine,
+                                recorder=recorder)
+    if 'edges' in outputs and isinstance(zones, InfectedZones):
+        # The connections are written while the simulation runs.
+        with open(outputs['edges'], 'w', newline='') as file:
+            zones.subscribe(EdgeWriter(file))
+            zones.add_state(states[first_state])
+    else:
+        zones.add_state(states[first_state])
+        if 'edges' in outputs:
+            _write_edges(zones, outputs['edges'])
+
+    if recorder is not None:
+        recorder.save(outputs['recording'])
+    if 'plot' in outputs:
+        from plotter import plot_diagram
+        plot_diagram(scenario['dataset'], get_edge_rows(zones), outputs['plot'])
+
+    if isinstance(zones, VectorizedZones):
+        susceptible, infective, removed = zones.get_numbers().sum(axis=0).tolist()
+    else:
+        susceptible = sum(len(state.sus) for state in states.values())
+        infective = sum(len(state.inf) for state in states.values())
+        removed = sum(len(state.rem) for state in states.values())
+    return {'name': scenario['name'], 'seed': seed, 'engine': engine, 'first_state': first_state,
+            'days': zones.day, 'infected_states': len(zones.get_infected_states()), 'edges': len(zones.edges),
+            'susceptible': susceptible, 'infective': infective, 'removed': removed}
+
+
+def run_batch(scenarios: list[dict[str, Any]], summary: Optional[str] = None,
+              verbose: bool = False) -> list[dict[str, Union[str, int, float]]]:
+    """Run every given scenario with every one of its seeds, in order, and return the summaries of the runs.
+    Every dataset is read once. If summary is given, the summary of every run is saved to a CSV file with this path
+    as soon as the run finishes.
+
+    Raise a ValueError before running anything if the first state or a state with a policy of a scenario
+    is not in its dataset.
+    If verbose is True, the summary of every run is printed when it finishes.
+
+    Preconditions:
+        - every scenario was returned by load_scenarios
+
+    >>> import tempfile
+    >>> from ensemble import run_replicate
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     path = os.path.join(folder, 'scenarios.json')
+    ...     with open(path, 'w') as file:
+    ...         json.dump({'defaults': {'dataset': os.path.abspath('data/states_small.csv'), 'seeds': [1, 2]},
+    ...                    'scenarios': [{'name': 'base'},
+    ...                                  {'name': 'lockdown', 'policies': {'Alaska': [1.0, 1.0, 1.0, True]},
+    ...                                   'outputs': {'edges': 'out/{name}-{seed}.csv'}}]}, file)
+    ...     scenarios = load_scenarios(path)
+    ...     results = run_batch(scenarios)
+    ...     sorted(os.listdir(os.path.join(folder, 'out')))
+    ['lockdown-1.csv', 'lockdown-2.csv']
+    >>> [(result['name'], result['seed']) for result in results]
+    [('base', 1), ('base', 2), ('lockdown', 1), ('lockdown', 2)]
+    >>> results[0]['days'] == run_replicate('data/states_small.csv', 1).days
+    True
+    >>> run_batch(scenarios + [dict(scenarios[0], name='typo', first_state='Nowhere')])  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    ValueError: states ['Nowhere'] of scenario 'typo' are not in .../data/states_small.csv
+    """
+    datasets = {}
+    for scenario in scenarios:
+        if scenario['dataset'] not in datasets:
+            datasets[scenario['dataset']] = read_dataset(scenario['dataset'])
+        _check_state_names(scenario, datasets[scenario['dataset']])
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        file, writer = None, None
+        if summary is not None:
+            file = stack.enter_context(open(summary, 'w', newline=''))
+            writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+        for scenario in scenarios:
+            for seed in scenario['seeds']:
+                result = run_scenario(scenario, seed, datasets[scenario['dataset']])
+                results.append(result)
+                if writer is not None:
+                    # The summary is written as the runs finish, so it is kept if a later run fails.
+                    writer.writerow(result)
+                    file.flush()
+                if verbose:
+                    print(' '.join(f'{field}={result[field]}' for field in SUMMARY_FIELDS), flush=True)
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the scenarios of the scenario file given in the command line arguments argv
+    (sys.argv[1:] if it is None)."""
+    parser = argparse.ArgumentParser(description='Run the simulation for every scenario of a scenario file, '
+                                                 'without asking for input or opening a browser.')
+    parser.add_argument('scenario_file', help='a JSON, TOML or CSV scenario file')
+    parser.add_argument('--summary', help='save the summary of every run to this CSV file')
+    parser.add_argument('--quiet', action='store_true', help='do not print the summary of every run')
+    args = parser.parse_args(argv)
+    try:
+        run_batch(load_scenarios(args.scenario_file), summary=args.summary, verbose=not args.quiet)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+def _complete_scenario(scenario: dict[str, Any], folder: str) -> dict[str, Any]:
+    """Return the given scenario with every field filled in, and its relative paths joined to the given folder.
+
+    Raise a ValueError if the scenario is not valid.
+    """
+    unknown = set(scenario) - set(SCENARIO_FIELDS)
+    if unknown:
+        raise ValueError(f'unknown scenario fields: {sorted(unknown)}')
+    if 'name' not in scenario or 'dataset' not in scenario or 'seeds' not in scenario:
+        raise ValueError(f'a scenario needs a name, a dataset and seeds: {scenario}')
+    engine = scenario.get('engine', 'count')
+    if engine not in ENSEMBLE_ENGINES:
+        raise ValueError(f'unknown engine {engine!r} in scenario {scenario["name"]!r}')
+    outputs = scenario['outputs']
+    if set(outputs) - set(OUTPUTS):
+        raise ValueError(f'unknown outputs {sorted(set(outputs) - set(OUTPUTS))} in scenario {scenario["name"]!r}')
+    policies = scenario.get('policies', {})
+    if any(len(policy) != 4 for policy in policies.values()):
+        raise ValueError(f'a policy needs isolation, maskwearing, vaccination and lockdown, '
+                         f'in scenario {scenario["name"]!r}')
+    seeds = scenario['seeds']
+    return {
+        'name': str(scenario['name']),
+        'dataset': os.path.join(folder, scenario['dataset']),
+        'engine': engine,
+        'seeds': [int(seed) for seed in (seeds if isinstance(seeds, list) else [seeds])],
+        'first_state': scenario.get('first_state'),
+        'policies': {state: [float(policy[0]), float(policy[1]), float(policy[2]), bool(policy[3])]
+                     for state, policy in policies.items()},
+        'outputs': {output: os.path.join(folder, path) for output, path in outputs.items()}
+    }
+
+
+def _check_state_names(scenario: dict[str, Any], rows: list[list[str]]) -> None:
+    """Raise a ValueError naming the given scenario if its first state or a state with a policy
+    is not in the given rows of its dataset.
+    """
+    names = {row[0] for row in rows}
+    unknown = set(scenario['policies']) - names
+    if scenario['first_state'] is not None and scenario['first_state'] not in names:
+        unknown.add(scenario['first_state'])
+    if unknown:
+        raise ValueError(f'states {sorted(unknown)} of scenario {scenario["name"]!r} are not in {scenario["dataset"]}')
+
+
+def _read_csv_scenarios(path: str) -> list[dict[str, Any]]:
+    """Return the scenarios in the CSV scenario file with the given path, in the same form as in a JSON file."""
+    scenarios = {}
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            row = {field: value.strip() for field, value in row.items() if value is not None and value.strip()}
+            if row.get('name') not in scenarios:
+                scenario = {field: row[field] for field in ('name', 'dataset', 'engine', 'first_state')
+                            if field in row}
+                if 'seeds' in row:
+                    scenario['seeds'] = row['seeds'].split()
+                scenario['outputs'] = {output: row[output] for output in OUTPUTS if output in row}
+                scenario['policies'] = {}
+                scenarios[row.get('name')] = scenario
+            if 'state' in row:
+                scenarios[row.get('name')]['policies'][row['state']] = [
+                    row.get('isolation', 1.0), row.get('maskwearing', 1.0), row.get('vaccination', 1.0),
+                    row.get('lockdown', 'F').upper() in ('T', 'TRUE', 'Y', 'YES', '1')]
+    return list(scenarios.values())
+
+
+def _write_edges(zones: Union[InfectedZones, VectorizedZones], path: str) -> None:
+    """Write the connections of the given finished simulation to a CSV file with the given path,
+    in the same format as an EdgeWriter.
+    """
+    states = zones.get_infected_states()
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(EDGE_FIELDS)
+        for day, source, target in zones.edges.rows():
+            writer.writerow([*states[source].location, *states[target].location, source, target, day])
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,126 @@
+"""CSC111 Winter 2023 Course Project: Pipeline Benchmarks
+
+Instructions
+===============================
+
+This Python module contains the benchmarks of the non-interactive simulation pipeline
+(ensemble.run_replicate, which runs populate_states, InfectedZones or VectorizedZones and add_state
+with a fixed seed) on every dataset under the data folder, with each engine that can run it.
+It is not collected by the normal test run, run it from the project folder with
+
+    python -m pytest benchmarks/bench_pipeline.py
+
+Each case runs in a new process, so its peak resident memory is its own, and reports the wall time
+(the median of several runs), the simulated days per second, the peak resident memory and the
+peak allocated bytes per person (measured in a separate run with tracemalloc).
+A case fails if it is slower or allocates more per person than its baseline in baseline.json
+by more than the threshold, or if it simulates a different number of days.
+See conftest.py for the options, including how to update the baselines.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import csv
+import multiprocessing
+import os
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import pytest
+
+from ensemble import run_replicate
+
+try:
+    import resource
+except ImportError:  # resource is not available on Windows
+    resource = None
+
+# The project folder
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The seed of every case, with it the infection reaches every state of every dataset
+SEED = 2023
+# The cases, as (dataset, engine), the engines that track every person are too slow and too large
+# for the real populations of states_full
+CASES = [(dataset, engine)
+         for dataset in ('states_small', 'states_several', 'states_many', 'states_full_people_not_full', 'states_full')
+         for engine in ('agent', 'table', 'count', 'vectorized')
+         if not (dataset == 'states_full' and engine in ('agent', 'table'))]
+# A slowdown below this many seconds is never a regression, since it is within the timing noise
+MIN_REGRESSION_SECONDS = 0.01
+# An increase below this many bytes per person is never a regression, for the datasets with huge populations
+MIN_REGRESSION_BYTES = 1.0
+
+
+def dataset_size(dataset: str) -> tuple[int, int]:
+    """Return the number of states and the total population of the given dataset under the data folder."""
+    with open(os.path.join(ROOT, 'data', dataset + '.csv')) as file:
+        rows = list(csv.DictReader(file))
+    return len(rows), sum(int(row['Population']) for row in rows)
+
+
+def measure(dataset: str, engine: str, repeats: int) -> dict[str, Optional[float]]:
+    """Run the pipeline on the given dataset with the given engine repeats times and once more with tracemalloc,
+    and return the measurements. This is run in a new process for every case.
+    """
+    path = os.path.join(ROOT, 'data', dataset + '.csv')
+    wall_times = []
+    days = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        days = run_replicate(path, SEED, engine).days
+        wall_times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run_replicate(path, SEED, engine)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    states, population = dataset_size(dataset)
+    peak_rss = None
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        scale = 1 if os.uname().sysname == 'Darwin' else 1024
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+    return {
+        'states': states,
+        'population': population,
+        'days': days,
+        'wall_time': statistics.median(wall_times),
+        'days_per_second': days / statistics.median(wall_times),
+        'peak_rss_mb': peak_rss,
+        'bytes_per_person': peak_bytes / population,
+    }
+
+
+@pytest.mark.parametrize('dataset, engine', CASES)
+def test_pipeline(dataset: str, engine: str, bench_config: dict, bench_results: dict) -> None:
+    """Benchmark the pipeline on the given dataset with the given engine, and compare it with the baseline."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        result = executor.submit(measure, dataset, engine, bench_config['repeats']).result()
+    key = f'{dataset}/{engine}'
+    bench_results[key] = result
+
+    baseline = bench_config['baselines'].get(key)
+    if baseline is None or bench_config['update']:
+        return
+    assert result['days'] == baseline['days'], \
+        f'{key} simulated {result["days"]} days instead of {baseline["days"]}, update the baselines if intended'
+    threshold = bench_config['threshold']
+    limit = max(baseline['wall_time'] * (1 + threshold), baseline['wall_time'] + MIN_REGRESSION_SECONDS)
+    assert result['wall_time'] <= limit, \
+        f'{key} took {result["wall_time"]:.4f}s, the baseline is {baseline["wall_time"]:.4f}s'
+    limit = max(baseline['bytes_per_person'] * (1 + threshold), baseline['bytes_per_person'] + MIN_REGRESSION_BYTES)
+    assert result['bytes_per_person'] <= limit, \
+        f'{key} allocated {result["bytes_per_person"]:.1f} bytes per person, ' \
+        f'the baseline is {baseline["bytes_per_person"]:.1f}'
@@ -0,0 +1,106 @@
+"""CSC111 Winter 2023 Course Project: Benchmark Configuration
+
+Instructions
+===============================
+
+This Python module contains the pytest options and fixtures of the benchmarks:
+
+- --bench-threshold: the allowed relative slowdown or increase of allocation against the baseline
+  (0.5 by default, which means 50%)
+- --bench-repeats: the number of timed runs of every case, the median is used (7 by default)
+- --bench-update: save the results as the new baselines in baseline.json instead of comparing with them
+
+At the end of the run, the results are saved in results.json in this folder, and the scaling curves of the
+wall time against the total population and against the number of states are printed for every engine.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+
+import pytest
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, 'results.json')
+
+# The simulation modules are in the project folder.
+if os.path.dirname(BENCHMARK_DIR) not in sys.path:
+    sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+RESULTS_KEY = pytest.StashKey[dict]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the options of the benchmarks."""
+    group = parser.getgroup('bench', 'simulation benchmarks')
+    group.addoption('--bench-threshold', type=float, default=0.5,
+                    help='allowed relative regression against the baselines (default 0.5)')
+    group.addoption('--bench-repeats', type=int, default=7,
+                    help='number of timed runs of every case (default 7)')
+    group.addoption('--bench-update', action='store_true',
+                    help='save the results as the new baselines')
+
+
+@pytest.fixture(scope='session')
+def bench_config(pytestconfig: pytest.Config) -> dict:
+    """Return the options of the benchmarks and the baselines."""
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as file:
+            baselines = json.load(file)
+    return {
+        'threshold': pytestconfig.getoption('bench_threshold'),
+        'repeats': pytestconfig.getoption('bench_repeats'),
+        'update': pytestconfig.getoption('bench_update'),
+        'baselines': baselines,
+    }
+
+
+@pytest.fixture(scope='session')
+def bench_results(pytestconfig: pytest.Config) -> dict:
+    """Return the dictionary where every benchmark stores its result."""
+    return pytestconfig.stash.setdefault(RESULTS_KEY, {})
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config) -> None:
+    """Save the results (and the baselines if asked to), and print the results and the scaling curves."""
+    results = config.stash.get(RESULTS_KEY, {})
+    if not results:
+        return
+    with open(RESULTS_FILE, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    if config.getoption('bench_update'):
+        baselines = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE) as file:
+                baselines = json.load(file)
+        baselines.update(results)
+        with open(BASELINE_FILE, 'w') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+    write = terminalreporter.write_line
+    terminalreporter.section('benchmark results')
+    write(f'{"case":<40}{"days":>6}{"wall (s)":>11}{"days/s":>11}{"RSS (MB)":>10}{"B/person":>11}')
+    for key, result in sorted(results.items()):
+        rss = '-' if result['peak_rss_mb'] is None else f'{result["peak_rss_mb"]:.1f}'
+        write(f'{key:<40}{result["days"]:>6}{result["wall_time"]:>11.4f}{result["days_per_second"]:>11.0f}'
+              f'{rss:>10}{result["bytes_per_person"]:>11.1f}')
+
+    for axis in ('population', 'states'):
+        terminalreporter.section(f'wall time against {axis}')
+        for engine in sorted({key.split('/')[1] for key in results}):
+            points = sorted((result[axis], result['wall_time']) for key, result in results.items()
+                            if key.split('/')[1] == engine)
+            write(f'{engine:<12}' + '  '.join(f'{x}: {y:.4f}s' for x, y in points))
@@ -0,0 +1,264 @@
+"""CSC111 Winter 2023 Course Project: Checkpoints
+
+Instructions
+===============================
+
+This Python module contains the functions for saving a running simulation to a snapshot file at the
+boundary between two days, and for continuing it from the snapshot later, for example after the job running
+a long simulation is stopped, or to look at the simulation in the middle of the epidemic.
+
+A snapshot is an uncompressed NPZ file of the arrays returned by InfectedZones.snapshot, with the state
+of the random module, so no Person object is pickled, and saving and loading are bulk array reads and writes.
+A simulation continued from a snapshot makes the same random choices, and ends in the same way,
+as if it had not been stopped.
+
+To stop a simulation at a day, set InfectedZones.stop_day before calling add_state or run;
+run_with_checkpoints does so repeatedly, saving a snapshot after every part.
+
+A ScenarioFork continues many variants of a simulation from the same paused day, for questions like
+"what if this state locked down on day 40?", without simulating the shared first days again.
+In the agent table model, the people of every branch are memory-mapped copy-on-write from the one snapshot,
+so the branches share the memory of the people none of them has changed.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import os
+import random
+import shutil
+import struct
+import tempfile
+import zipfile
+from typing import Optional
+
+import numpy as np
+
+from graph import InfectedZones
+
+# The columns of an AgentTable in a snapshot, which can be memory-mapped instead of read
+TABLE_COLUMNS = ('table.compartment', 'table.infected_day', 'table.order')
+# The size of the fixed part of the local header of a member of a ZIP file
+ZIP_LOCAL_HEADER = 30
+# The name of the snapshot file of a ScenarioFork in its folder
+FORK_FILE = 'fork.npz'
+
+
+def save_snapshot(zones: InfectedZones, path: str) -> None:
+    """Save the given simulation and the state of the random module to a snapshot file with the given path.
+    The file is written next to path first and then renamed, so an interrupted save never leaves
+    a broken snapshot at path.
+
+    Preconditions:
+        - zones is not running, that is, it was paused by its stop_day or it has finished
+    """
+    arrays = zones.snapshot()
+    version, internal, gauss_next = random.getstate()
+    arrays['random.state'] = np.array(internal, dtype=np.int64)
+    arrays['random.extra'] = np.array([version, np.nan if gauss_next is None else gauss_next], dtype=np.float64)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(temporary, path)
+
+
+def load_snapshot(path: str, store: Optional[str] = None, mmap_mode: Optional[str] = None) -> InfectedZones:
+    """Return the simulation saved in the snapshot file with the given path, and restore the state of the
+    random module saved with it, so calling run on the simulation continues it exactly.
+
+    In the agent table model, the people are copied to memory-mapped files in the folder with the path store
+    if it is given (see simulations.populate_states). Otherwise, if mmap_mode is 'r' or 'c', the columns of the
+    table are memory-mapped from the snapshot file itself in this mode instead of being read into memory
+    ('c' is copy-on-write, where changes stay in memory and the file is not changed).
+
+    Preconditions:
+        - path is a snapshot file saved by save_snapshot
+        - mmap_mode in {None, 'r', 'c'}
+
+    >>> import tempfile
+    >>> from simulations import populate_states
+    >>> random.seed(1)
+    >>> states, keys = populate_states('data/states_small.csv', engine='count')
+    >>> zones = InfectedZones(states, keys)
+    >>> zones.stop_day = 30
+    >>> zones.add_state(states[keys[0]])
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     save_snapshot(zones, os.path.join(folder, 'day30.npz'))
+    ...     zones.stop_day = None
+    ...     zones.run()
+    ...     resumed = load_snapshot(os.path.join(folder, 'day30.npz'))
+    >>> resumed.day
+    30
+    >>> resumed.run()
+    >>> resumed.day == zones.day and resumed.edges.rows() == zones.edges.rows()
+    True
+    """
+    mapped = store is not None or mmap_mode is not None
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files if not (mapped and name in TABLE_COLUMNS)}
+    if mapped and 'table.rng' in arrays:
+        for name in TABLE_COLUMNS:
+            arrays[name] = _map_member(path, name, 'r' if store is not None else mmap_mode)
+    return _restore(arrays, store)
+
+
+def run_with_checkpoints(zones: InfectedZones, path: str, interval: int) -> None:
+    """Continue the given simulation until it finishes, stopping every interval days to save a snapshot
+    to the file with the given path, which always holds the latest day boundary reached.
+    After the job running it is stopped, the simulation is continued with
+    run_with_checkpoints(load_snapshot(path), path, interval).
+
+    To start a new simulation this way, set stop_day of zones to its current day before calling add_state,
+    so that add_state only schedules the first state.
+
+    Preconditions:
+        - zones is not running
+        - interval >= 1
+    """
+    while not zones.is_finished():
+        zones.stop_day = zones.day + interval
+        zones.run()
+        save_snapshot(zones, path)
+    zones.stop_day = None
+
+
+class ScenarioFork:
+    """A simulation paused at a day, from which any number of branches can be continued.
+
+    Every branch is a new InfectedZones created from one snapshot of the simulation, so changing a branch,
+    for example with change_a_and_r or movement_prohibited, does not change the others.
+    Creating a branch restores the state of the random module to the one at the fork, so a branch
+    created right before it runs sees the same random numbers as the simulation would have without the change,
+    and the differences between the branches come from their changes only.
+
+    Instance Attributes
+    - day: the day the simulation was paused at
+    - path: the path of the snapshot file of the fork
+
+    Private Instance Attributes
+    - _folder: The temporary folder of the snapshot file that is deleted by close, or None if the folder
+      was given by the user.
+    - _arrays: The arrays of the snapshot, except the columns of the agent table, which are memory-mapped
+      by every branch.
+
+    >>> from simulations import populate_states
+    >>> random.seed(1)
+    >>> states, keys = populate_states('data/states_small.csv', engine='count')
+    >>> zones = InfectedZones(states, keys)
+    >>> zones.stop_day = 20
+    >>> zones.add_state(states[keys[0]])
+    >>> with ScenarioFork(zones) as fork:
+    ...     same = fork.branch()
+    ...     same.run()
+    ...     locked = fork.branch()
+    ...     locked.movement_prohibited(keys[0])
+    ...     locked.run()
+    >>> random.seed(1)
+    >>> states, keys = populate_states('data/states_small.csv', engine='count')
+    >>> uninterrupted = InfectedZones(states, keys)
+    >>> uninterrupted.add_state(states[keys[0]])
+    >>> same.day == uninterrupted.day and same.edges.rows() == uninterrupted.edges.rows()
+    True
+    """
+    day: int
+    path: str
+    _folder: Optional[str]
+    _arrays: dict[str, np.ndarray]
+
+    def __init__(self, zones: InfectedZones, folder: Optional[str] = None) -> None:
+        """Fork the given paused simulation, by saving its snapshot to the folder with the given path,
+        or to a temporary folder if folder is None. The given simulation is not changed.
+
+        Preconditions:
+            - zones is not running, that is, it was paused by its stop_day
+        """
+        self._folder = tempfile.mkdtemp(prefix='fork') if folder is None else None
+        self.path = os.path.join(folder if folder is not None else self._folder, FORK_FILE)
+        self.day = zones.day
+        save_snapshot(zones, self.path)
+        with np.load(self.path) as data:
+            self._arrays = {name: data[name] for name in data.files if name not in TABLE_COLUMNS}
+
+    def __enter__(self) -> ScenarioFork:
+        """Return this fork, which is closed at the end of the with statement."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close this fork."""
+        self.close()
+
+    def branch(self) -> InfectedZones:
+        """Return a new branch of the simulation, paused at the day of the fork, and restore the state of
+        the random module at the fork. The branch continues when its run method is called.
+
+        Preconditions:
+            - this fork is not closed
+        """
+        arrays = dict(self._arrays)
+        if 'table.rng' in arrays:
+            for name in TABLE_COLUMNS:
+                arrays[name] = _map_member(self.path, name, 'c')
+        return _restore(arrays)
+
+    def close(self) -> None:
+        """Delete the snapshot file if it is in a temporary folder.
+        The branches that have been created keep working, since their memory-mapped people are only removed
+        from the disk when they are closed.
+        """
+        if self._folder is not None:
+            shutil.rmtree(self._folder, ignore_errors=True)
+            self._folder = None
+
+
+def _restore(arrays: dict[str, np.ndarray], store: Optional[str] = None) -> InfectedZones:
+    """Restore the state of the random module saved in the given arrays of a snapshot file,
+    and return the simulation created from the other arrays (see InfectedZones.from_snapshot).
+    """
+    arrays = dict(arrays)
+    internal = tuple(arrays.pop('random.state').tolist())
+    version, gauss_next = arrays.pop('random.extra').tolist()
+    random.setstate((int(version), internal, None if np.isnan(gauss_next) else gauss_next))
+    return InfectedZones.from_snapshot(arrays, store)
+
+
+def _map_member(path: str, name: str, mode: str) -> np.ndarray:
+    """Return the array with the given name in the NPZ file with the given path, memory-mapped in the given mode.
+    np.load cannot memory-map the arrays of an NPZ file, but the arrays of an uncompressed one are stored
+    as whole .npy files inside it, which can be mapped from their offset.
+
+    Preconditions:
+        - the NPZ file is not compressed
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name + '.npy')
+    with open(path, 'rb') as file:
+        file.seek(info.header_offset)
+        name_length, extra_length = struct.unpack('<HH', file.read(ZIP_LOCAL_HEADER)[26:30])
+        file.seek(info.header_offset + ZIP_LOCAL_HEADER + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    return np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['os', 'random', 'shutil', 'struct', 'tempfile', 'zipfile', 'numpy', 'graph', 'simulations'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'C0415']
+    })
@@ -0,0 +1,477 @@
+"""CSC111 Winter 2023 Course Project: Distributed Simulation
+
+Instructions
+===============================
+
+This Python module runs one simulation with its states partitioned across worker processes, for graphs whose
+people do not fit in one process. Every worker populates and simulates only the states of its partition,
+so the memory and the work of the people are divided between the workers.
+
+The workers advance in lockstep, and only talk at the day barriers, through the coordinator:
+
+- When a state infects a state of another partition (State.infect_next_state, which calls add_state and
+  add_edge), the infection is sent to the partition of the infected state at the end of the day, where it
+  takes its patient zero and schedules its infection process for the next day, as add_state does.
+- At every barrier, every worker reports the numbers of susceptible and infective people of its states that
+  changed, so the other workers can choose their targets with the same scores (see State.get_target_weight).
+  The states of the other partitions are kept in every worker as count-based copies holding these numbers.
+
+The barriers are only needed on the days a state can infect another state. While every state of every partition
+is quiescent (see State.is_quiescent) or not running, the workers simulate the days until the next scheduled
+infection process without waiting for each other, and once no state can infect another state any more,
+every worker finishes its simulation on its own.
+
+The messages go through a Transport, which decides where the workers run and how the messages travel;
+QueueTransport runs the workers as processes on this machine and sends the messages through multiprocessing
+queues, and a transport over the network can run them on other hosts.
+
+A distributed run is reproducible from its seed and its number of partitions, but it is not the same as the
+run of ensemble.run_replicate with the same seed: every worker has its own random numbers, and a state of another
+partition only learns that it was infected at the end of the day.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import multiprocessing
+import queue
+import random
+import traceback
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from edges import EdgeStore
+from ensemble import ReplicateResult, replicate_seeds
+from graph import InfectedZones, State
+from simulations import ENGINES, apply_policies, populate_states, read_dataset
+from sir_model import InfectiveCount, SusceptibleCount
+
+# The seconds the coordinator waits for a message before checking that the worker processes are still running
+POLL_SECONDS = 1.0
+# The seconds close waits for a worker process to exit before terminating it
+JOIN_SECONDS = 5.0
+
+
+class Endpoint:
+    """The end of a Transport in a worker, through which the worker receives the messages of the coordinator
+    and replies to it. Every message is a tuple of objects that can be pickled.
+    """
+
+    def receive(self) -> tuple:
+        """Return the next message of the coordinator to this worker, waiting for it if needed."""
+        raise NotImplementedError
+
+    def reply(self, message: tuple) -> None:
+        """Send the given message to the coordinator."""
+        raise NotImplementedError
+
+
+class Transport:
+    """The channels between the coordinator of a distributed simulation and its workers, one for every partition.
+    A subclass decides where the workers run and how the messages travel.
+    Every message is a tuple of objects that can be pickled.
+    """
+
+    def start(self, partitions: int, worker: Callable[..., None], args: tuple) -> None:
+        """Start one worker for every partition, the worker of partition index calls
+        worker(endpoint, index, *args) with its Endpoint.
+
+        Preconditions:
+            - partitions >= 1
+            - worker is a function at the top level of a module
+        """
+        raise NotImplementedError
+
+    def send(self, index: int, message: tuple) -> None:
+        """Send the given message to the worker of the partition with the given index."""
+        raise NotImplementedError
+
+    def collect(self) -> tuple:
+        """Return the next message replied by any worker, waiting for it if needed.
+        Raise a RuntimeError if a worker stopped without replying.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Stop the workers and release the channels."""
+        raise NotImplementedError
+
+
+class QueueEndpoint(Endpoint):
+    """The end of a QueueTransport in a worker process.
+
+    Private Instance Attributes
+    - _inbox: The queue of the messages of the coordinator to this worker.
+    - _replies: The queue of the messages of all workers to the coordinator.
+    """
+    _inbox: multiprocessing.Queue
+    _replies: multiprocessing.Queue
+
+    def __init__(self, inbox: multiprocessing.Queue, replies: multiprocessing.Queue) -> None:
+        """Initialize the endpoint with the given queues."""
+        self._inbox = inbox
+        self._replies = replies
+
+    def receive(self) -> tuple:
+        """Return the next message of the coordinator to this worker, waiting for it if needed."""
+        return self._inbox.get()
+
+    def reply(self, message: tuple) -> None:
+        """Send the given message to the coordinator."""
+        self._replies.put(message)
+
+
+class QueueTransport(Transport):
+    """A Transport running every worker in its own process on this machine,
+    with a multiprocessing queue to every worker and one queue back to the coordinator.
+
+    Private Instance Attributes
+    - _context: The multiprocessing context the processes and queues are created with.
+    - _inboxes: The queue of the messages to every worker.
+    - _replies: The queue of the messages of all workers to the coordinator.
+    - _processes: The process of every worker.
+    """
+    _context: Any
+    _inboxes: list[multiprocessing.Queue]
+    _replies: Optional[multiprocessing.Queue]
+    _processes: list[multiprocessing.Process]
+
+    def __init__(self, start_method: Optional[str] = None) -> None:
+        """Initialize a transport whose processes are started with the given start method of multiprocessing
+        ('fork', 'spawn' or 'forkserver'), or with the default one if start_method is None.
+        """
+        self._context = multiprocessing.get_context(start_method)
+        self._inboxes = []
+        self._replies = None
+        self._processes = []
+
+    def start(self, partitions: int, worker: Callable[..., None], args: tuple) -> None:
+        """Start one worker process for every partition, the worker of partition index calls
+        worker(endpoint, index, *args) with its QueueEndpoint.
+
+        Preconditions:
+            - partitions >= 1
+            - worker is a function at the top level of a module
+        """
+        self._replies = self._context.Queue()
+        self._inboxes = [self._context.Queue() for _ in range(partitions)]
+        self._processes = [self._context.Process(target=worker, args=(QueueEndpoint(inbox, self._replies), index,
+                                                                      *args), daemon=True)
+                           for index, inbox in enumerate(self._inboxes)]
+        for process in self._processes:
+            process.start()
+
+    def send(self, index: int, message: tuple) -> None:
+        """Send the given message to the worker of the partition with the given index."""
+        self._inboxes[index].put(message)
+
+    def collect(self) -> tuple:
+        """Return the next message replied by any worker, waiting for it if needed.
+        Raise a RuntimeError if a worker process exited without replying.
+        """
+        while True:
+            try:
+                return self._replies.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if any(process.exitcode not in (None, 0) for process in self._processes):
+                    raise RuntimeError('a worker process of the distributed simulation exited') from None
+
+    def close(self) -> None:
+        """Wait for the worker processes to exit, terminating the ones that do not, and close the queues."""
+        for process in self._processes:
+            process.join(JOIN_SECONDS)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for channel in self._inboxes + ([self._replies] if self._replies is not None else []):
+            channel.close()
+        self._inboxes, self._replies, self._processes = [], None, []
+
+
+class PartitionZones(InfectedZones):
+    """The InfectedZones of one worker of a distributed simulation. It has every state of the dataset,
+    but only simulates the states of its partition. The other states are count-based copies, which hold the
+    numbers last reported by their partitions, so the states of the partition choose their targets among
+    all states.
+
+    Instance Attributes
+    - owned: the names of the states of this partition
+    - outbox: the infections of the states of other partitions made since the last barrier,
+      as (day, infecting state name, infected state name)
+
+    Private Instance Attributes
+    - _reported: A dictionary mapping the name of every state of this partition to its numbers of susceptible
+      and infective people when they were last reported by report.
+
+    Representation Invariants:
+    - all(target not in self.owned for _, _, target in self.outbox)
+    """
+    owned: set[str]
+    outbox: list[tuple[int, str, str]]
+    _reported: dict[str, tuple[int, int]]
+
+    def __init__(self, all_states: dict[str, State], state_names: list[str], owned: set[str]) -> None:
+        """Initialize the zones of a partition with every state of the dataset, where the states whose names
+        are in owned are the states of the partition, and the other states are count-based copies.
+
+        Preconditions:
+            - set(all_states.keys()) == set(state_names)
+            - owned <= set(state_names)
+        """
+        super().__init__(all_states, state_names)
+        self.owned = owned
+        self.outbox = []
+        self._reported = {}
+
+    def add_state(self, state: State) -> None:
+        """Add a new infected state as in InfectedZones.add_state if it is a state of this partition.
+        Otherwise, only take a patient zero from the copy of the state, so the copy stays up to date until
+        the next barrier; the infection itself is put in the outbox by add_edge, which
+        State.infect_next_state calls right after add_state.
+        """
+        if state.name in self.owned:
+            return super().add_state(state)
+        self._infected_states[state.name] = state
+        state.get_patient_zero()
+        self.update_target(state)
+        return None
+
+    def add_edge(self, state1_name: str, state2_name: str, day: Optional[int] = None) -> None:
+        """Add an edge as in InfectedZones.add_edge, and put the infection in the outbox
+        if the infected state is a state of another partition.
+        """
+        super().add_edge(state1_name, state2_name, day)
+        if state2_name not in self.owned:
+            self.outbox.append((self.day if day is None else day, state1_name, state2_name))
+
+    def receive_infection(self, day: int, source_name: Optional[str], target_name: str) -> None:
+        """Infect the state of this partition named target_name, because it was infected by the state named
+        source_name (of another partition) on the given day, or because it is the first infected state
+        if source_name is None. Its infection process is scheduled to start today, which is the day
+        after the infection.
+
+        Preconditions:
+            - target_name in self.owned
+            - source_name is None or source_name in self._all_states
+        """
+        self.infect_state(self._all_states[target_name], self.day)
+        if source_name is not None:
+            self._infected_states.setdefault(source_name, self._all_states[source_name])
+            self.add_edge(source_name, target_name, day)
+
+    def report(self) -> dict[str, tuple[int, int]]:
+        """Return a dictionary mapping the name of every state of this partition whose number of susceptible
+        or infective people changed since the last report to these two numbers.
+        """
+        changed = {}
+        for name in self.owned:
+            state = self._all_states[name]
+            numbers = (len(state.sus), len(state.inf))
+            if self._reported.get(name) != numbers:
+                changed[name] = self._reported[name] = numbers
+        return changed
+
+    def update_copies(self, numbers: dict[str, tuple[int, int]]) -> None:
+        """Update the copies of the states of other partitions with the numbers of susceptible and infective
+        people in the given dictionary, which maps state names to them as returned by report.
+        The states of this partition in the dictionary are ignored.
+        """
+        for name, (susceptible, infective) in numbers.items():
+            if name not in self.owned:
+                state = self._all_states[name]
+                state.sus = SusceptibleCount(susceptible)
+                state.inf = InfectiveCount(infective)
+                self.update_target(state)
+
+    def next_spread_day(self) -> Optional[int]:
+        """Return the first day a state of this partition can infect another state on: today if a running state
+        is not quiescent, otherwise the day the next scheduled infection process starts,
+        or None if no state of this partition can infect another state any more.
+        """
+        if any(not state.is_quiescent() for state in self._active):
+            return self.day
+        return self._seeding[0][0] if self._seeding else None
+
+
+def partition_states(rows: list[list[str]], partitions: int) -> dict[str, int]:
+    """Return a dictionary mapping the name of every state in the given rows of a dataset (as returned by
+    simulations.read_dataset) to the index of its partition, so the partitions have similar populations.
+    The largest states are assigned first, each to the partition with the smallest population so far.
+
+    Preconditions:
+        - partitions >= 1
+
+    >>> rows = read_dataset('data/states_small.csv')
+    >>> partition_states(rows, 2)
+    {'Arkansas': 0, 'Alaska': 1, 'Arizona': 1}
+    """
+    totals = [0] * partitions
+    owners = {}
+    for row in sorted(rows, key=lambda row: -int(row[3])):
+        index = totals.index(min(totals))
+        owners[row[0]] = index
+        totals[index] += int(row[3])
+    return owners
+
+
+def run_distributed(dataset: str, seed: int, partitions: int = 2, engine: str = 'count',
+                    policies: Optional[dict[str, list]] = None,
+                    transport: Optional[Transport] = None) -> ReplicateResult:
+    """Run one simulation on the given dataset with the given seed, with its states partitioned between
+    the given number of workers started by transport (a QueueTransport by default), and return its result.
+    policies is in the same format as returned by simulations.get_user_input.
+    The first infected state is chosen with the seed, and every worker gets its own seed derived from it.
+
+    Raise a ValueError if engine is not in simulations.ENGINES, or a RuntimeError if a worker fails.
+
+    Preconditions:
+        - dataset is a valid path to the file
+        - partitions >= 1
+        - policies is None or all its keys are states in dataset
+
+    >>> result = run_distributed('data/states_small.csv', 7, partitions=2)
+    >>> again = run_distributed('data/states_small.csv', 7, partitions=2)
+    >>> result.days == again.days and bool((result.final == again.final).all())
+    True
+    >>> int(result.final.sum()), bool(result.infected.all()), len(result.edges)
+    (2450, True, 3)
+    """
+    if engine not in ENGINES:
+        raise ValueError
+    rows = read_dataset(dataset)
+    keys = [row[0] for row in rows]
+    owners = partition_states(rows, partitions)
+    random.seed(seed)
+    first_state = random.choice(keys)
+    transport = QueueTransport() if transport is None else transport
+    transport.start(partitions, _run_worker, (rows, owners, engine, replicate_seeds(seed, partitions), policies))
+    try:
+        inboxes = [[] for _ in range(partitions)]
+        inboxes[owners[first_state]].append((0, None, first_state))
+        numbers = {}
+        next_days = [None] * partitions
+        day = 0
+        while True:
+            # The infections sent today start their infection process today, and can spread on it.
+            spread_days = [day] if any(inboxes) else [d for d in next_days if d is not None]
+            if not spread_days:
+                break
+            end = min(spread_days) + 1
+            for index in range(partitions):
+                transport.send(index, ('step', end, inboxes[index], numbers))
+            replies = _collect(transport, partitions)
+            inboxes = [[] for _ in range(partitions)]
+            numbers = {}
+            for _, index, outbox, report, next_day in replies:
+                next_days[index] = next_day
+                numbers.update(report)
+                for infection in outbox:
+                    inboxes[owners[infection[2]]].append(infection)
+            day = end
+
+        # No state can infect another state any more, so every partition finishes on its own.
+        for index in range(partitions):
+            transport.send(index, ('finish',))
+        replies = _collect(transport, partitions)
+    finally:
+        transport.close()
+
+    final = {}
+    infected_states = set()
+    edge_rows = []
+    for _, _, _, states, infected, rows_of_edges in replies:
+        final.update(states)
+        infected_states.update(infected)
+        edge_rows.extend(rows_of_edges)
+    # An infection between two partitions is kept by both, on the same day.
+    edges = EdgeStore()
+    for edge_day, source_name, target_name in sorted(edge_rows, key=lambda row: row[0]):
+        edges.add(edge_day, source_name, target_name)
+    index = {name: i for i, name in enumerate(keys)}
+    pairs = [sorted(index[name] for name in pair) for pair in edges.pairs()]
+    return ReplicateResult(
+        seed=seed,
+        first_state=index[first_state],
+        days=max(reply[2] for reply in replies),
+        final=np.array([final[name] for name in keys], dtype=np.int64).reshape((len(keys), 3)),
+        infected=np.array([name in infected_states for name in keys], dtype=bool),
+        edges=np.array(pairs, dtype=np.int32).reshape((len(pairs), 2))
+    )
+
+
+def _collect(transport: Transport, partitions: int) -> list[tuple]:
+    """Return the next reply of every worker, in the order of the partitions.
+    Raise a RuntimeError with the traceback of the worker if a worker failed.
+    """
+    replies = [None] * partitions
+    for _ in range(partitions):
+        reply = transport.collect()
+        if reply[0] == 'error':
+            raise RuntimeError(f'partition {reply[1]} failed:\n{reply[2]}')
+        replies[reply[1]] = reply
+    return replies
+
+
+def _run_worker(endpoint: Endpoint, index: int, rows: list[list[str]], owners: dict[str, int], engine: str,
+                seeds: list[int], policies: Optional[dict[str, list]]) -> None:
+    """Populate and simulate the states of the partition with the given index, following the messages of the
+    coordinator received from endpoint, until it is told to finish.
+
+    On a ('step', end, infections, numbers) message, the worker updates its copies of the states of other
+    partitions with numbers, receives the given infections, simulates the days until end,
+    and replies ('step', index, outbox, report, next spread day).
+    On a ('finish',) message, it simulates until its states have no infected people, and replies
+    ('done', index, day, final numbers of its states, names of its infected states, rows of its edges).
+    If anything fails, it replies ('error', index, traceback).
+    """
+    try:
+        random.seed(seeds[index])
+        states, _ = populate_states([row for row in rows if owners[row[0]] == index], engine=engine)
+        copies, _ = populate_states([row for row in rows if owners[row[0]] != index], engine='count')
+        zones = PartitionZones({**states, **copies}, [row[0] for row in rows], set(states))
+        if policies is not None:
+            apply_policies(zones, policies)
+
+        message = endpoint.receive()
+        while message[0] == 'step':
+            _, end, infections, numbers = message
+            zones.update_copies(numbers)
+            for day, source_name, target_name in infections:
+                zones.receive_infection(day, source_name, target_name)
+            zones.stop_day = end
+            zones.run()
+            # A partition without running states waits at the barrier.
+            zones.day = max(zones.day, end)
+            endpoint.reply(('step', index, zones.outbox, zones.report(), zones.next_spread_day()))
+            zones.outbox = []
+            message = endpoint.receive()
+
+        zones.stop_day = None
+        zones.run()
+        infected_states = zones.get_infected_states()
+        endpoint.reply(('done', index, zones.day,
+                        {name: (len(state.sus), len(state.inf), len(state.rem)) for name, state in states.items()},
+                        [name for name in states if name in infected_states], zones.edges.rows()))
+    except Exception:  # the coordinator raises the error with its traceback
+        endpoint.reply(('error', index, traceback.format_exc()))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['multiprocessing', 'queue', 'random', 'traceback', 'numpy', 'edges', 'ensemble', 'graph',
+                          'simulations', 'sir_model'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'W0703', 'R0914']
+    })
@@ -0,0 +1,167 @@
+"""CSC111 Winter 2023 Course Project: Edges
+
+Instructions
+===============================
+
+This Python module contains the EdgeStore class, which keeps the connections between the states
+made during a simulation, and EdgeWriter, an observer that writes every new connection to a CSV file
+as soon as it is made.
+
+A connection is made when a state infects another state. Every pair of connected states is kept once,
+under its canonical key (the two names in sorted order), with the day and the direction of the first
+infection between them, so adding a connection and checking whether two states are connected take
+constant time, and the connections never need to be deduplicated at the end of a simulation.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import csv
+from array import array
+from typing import TextIO, TYPE_CHECKING
+
+from observers import Observer
+
+if TYPE_CHECKING:
+    from graph import InfectedZones
+
+# The columns of the file written by EdgeWriter, the first six are the columns of simulations.graph_to_csv
+EDGE_FIELDS = ('start_lat', 'start_lon', 'end_lat', 'end_lon', 'state1', 'state2', 'day')
+
+
+def edge_key(state1_name: str, state2_name: str) -> tuple[str, str]:
+    """Return the canonical key of the connection between the two states with the given names.
+
+    >>> edge_key('Texas', 'Alaska') == edge_key('Alaska', 'Texas') == ('Alaska', 'Texas')
+    True
+    """
+    return (state1_name, state2_name) if state1_name <= state2_name else (state2_name, state1_name)
+
+
+class EdgeStore:
+    """The connections between the states, in the order they were made.
+
+    Private Instance Attributes
+    - _index: A dictionary mapping the canonical key of every connection to its position.
+    - _days: The day of the first infection of every connection.
+    - _sources: The name of the infecting state of the first infection of every connection.
+    - _targets: The name of the infected state of the first infection of every connection.
+
+    Representation Invariants:
+    - len(self._index) == len(self._days) == len(self._sources) == len(self._targets)
+    - all(self._index[edge_key(s, t)] == i for i, (s, t) in enumerate(zip(self._sources, self._targets)))
+
+    >>> store = EdgeStore()
+    >>> store.add(3, 'Texas', 'Alaska')
+    True
+    >>> store.add(5, 'Alaska', 'Texas')
+    False
+    >>> len(store), ('Alaska', 'Texas') in store
+    (1, True)
+    >>> store.rows()
+    [(3, 'Texas', 'Alaska')]
+    """
+    _index: dict[tuple[str, str], int]
+    _days: array
+    _sources: list[str]
+    _targets: list[str]
+
+    def __init__(self) -> None:
+        """Initialize a store with no connection."""
+        self._index = {}
+        self._days = array('q')
+        self._sources = []
+        self._targets = []
+
+    def __len__(self) -> int:
+        """Return the number of connections."""
+        return len(self._days)
+
+    def __contains__(self, pair: tuple[str, str]) -> bool:
+        """Return whether the two states with the names in pair are connected, in either direction."""
+        return edge_key(*pair) in self._index
+
+    def add(self, day: int, source_name: str, target_name: str) -> bool:
+        """Record that the state named source_name infected the state named target_name on the given day,
+        and return whether this made a new connection. Nothing is recorded if the two states are connected already.
+
+        Preconditions:
+            - source_name != target_name
+        """
+        key = edge_key(source_name, target_name)
+        if key in self._index:
+            return False
+        self._index[key] = len(self._days)
+        self._days.append(day)
+        self._sources.append(source_name)
+        self._targets.append(target_name)
+        return True
+
+    def pairs(self) -> list[tuple[str, str]]:
+        """Return the canonical key of every connection, in the order they were made."""
+        return list(self._index)
+
+    def rows(self) -> list[tuple[int, str, str]]:
+        """Return (day, source name, target name) of the first infection of every connection,
+        in the order they were made.
+        """
+        return list(zip(self._days, self._sources, self._targets))
+
+
+class EdgeWriter(Observer):
+    """An observer that writes every new connection of a simulation to a CSV file as soon as it is made,
+    with the columns in EDGE_FIELDS, where state1 is the infecting state and state2 is the infected state.
+    The file has the columns of simulations.graph_to_csv, so it can be given to plotter.plot_diagram.
+    The written rows are flushed to the file at the end of every interval-th day, so the file of a long
+    simulation grows while it runs.
+
+    Instance Attributes
+    - file: the file the connections are written to
+
+    Private Instance Attributes
+    - _writer: The CSV writer of file.
+    """
+    file: TextIO
+    _writer: csv.writer
+
+    def __init__(self, file: TextIO, interval: int = 1) -> None:
+        """Initialize an observer writing to the given opened text file, and write the header row.
+
+        Preconditions:
+            - file was opened for writing with newline=''
+            - interval >= 1
+        """
+        super().__init__(interval)
+        self.file = file
+        self._writer = csv.writer(file)
+        self._writer.writerow(EDGE_FIELDS)
+
+    def on_edge_added(self, zones: InfectedZones, state1_name: str, state2_name: str) -> None:
+        """Write the new connection made when the state named state1_name infected the one named state2_name."""
+        states = zones.get_infected_states()
+        start_lat, start_lon = states[state1_name].location
+        end_lat, end_lon = states[state2_name].location
+        self._writer.writerow([start_lat, start_lon, end_lat, end_lon, state1_name, state2_name, zones.day])
+
+    def on_day_end(self, zones: InfectedZones, day: int) -> None:
+        """Flush the rows written so far to the file."""
+        self.file.flush()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['csv', 'array', 'observers', 'graph'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'W0613']
+    })
@@ -0,0 +1,175 @@
+"""CSC111 Winter 2023 Course Project: Ensemble
+
+Instructions
+===============================
+
+This Python module contains the functions for running many independent replicates of the simulation.
+Every run of main() is one random outcome of the simulation, so to study the parameters we need
+the results of many runs. run_ensemble runs the same pipeline as main(), that is
+populate_states, choosing a random first state and InfectedZones.add_state,
+without asking for input and without plotting, in a pool of worker processes.
+Every replicate has its own seed, so any replicate can be reproduced on its own with run_replicate.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import contextlib
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+
+from graph import InfectedZones
+from observers import FlushObserver
+from simulations import apply_policies, populate_states
+from vectorized import VectorizedZones
+
+# The engines a replicate can be run with, 'agent', 'count' and 'table' are the models of populate_states,
+# 'vectorized' runs the count-based model with VectorizedZones,
+# and 'binomial' and 'mean_field' run VectorizedZones in its binomial (tau-leaping) and mean-field modes.
+ENSEMBLE_ENGINES = ('agent', 'count', 'table', 'vectorized', 'binomial', 'mean_field')
+
+
+class ReplicateResult(NamedTuple):
+    """The result of one replicate of the simulation, in a compact form.
+
+    Instance Attributes
+    - seed: the seed this replicate was run with
+    - first_state: the index of the state that was infected first
+    - days: the number of days simulated
+    - final: an array of shape (number of states, 3), where final[i] is the final number of
+      susceptible, infective and removed people of the i-th state (fractional for the 'mean_field' engine)
+    - infected: an array of shape (number of states,), whether each state has been infected
+    - edges: an array of shape (number of connections, 2), each row is the indices of two connected states
+    """
+    seed: int
+    first_state: int
+    days: int
+    final: np.ndarray
+    infected: np.ndarray
+    edges: np.ndarray
+
+
+def replicate_seeds(seed: Optional[int], replicates: int) -> list[int]:
+    """Return the seeds for the given number of replicates, derived from the given seed.
+    The same seed always gives the same seeds, and the seeds of different replicates are independent.
+
+    >>> replicate_seeds(0, 3) == replicate_seeds(0, 3)
+    True
+    >>> len(set(replicate_seeds(0, 3)))
+    3
+    """
+    sequences = np.random.SeedSequence(seed).spawn(replicates)
+    return [int(s.generate_state(1, dtype=np.uint64)[0]) for s in sequences]
+
+
+def run_replicate(dataset: str, seed: int, engine: str = 'count',
+                  policies: Optional[dict[str, list]] = None, store: Optional[str] = None) -> ReplicateResult:
+    """Run one replicate of the simulation on the given dataset with the given seed, and return its result.
+    policies is in the same format as returned by simulations.get_user_input.
+    The progress printed by the simulation is discarded.
+    If store is given with the 'table' engine, the people are stored in memory-mapped files in the folder
+    with this path (see simulations.populate_states), which are flushed at the end of every day.
+
+    Raise a ValueError if engine is not in ENSEMBLE_ENGINES.
+
+    Preconditions:
+        - dataset is a valid path to the file
+        - policies is None or all its keys are states in dataset
+
+    >>> result = run_replicate('data/states_small.csv', 7)
+    >>> again = run_replicate('data/states_small.csv', 7)
+    >>> result.days == again.days and bool((result.final == again.final).all())
+    True
+    >>> int(result.final.sum())
+    2450
+    """
+    if engine not in ENSEMBLE_ENGINES:
+        raise ValueError
+    random.seed(seed)
+    if engine == 'table':
+        states, keys = populate_states(dataset, engine=engine, store=store)
+    else:
+        states, keys = populate_states(dataset, engine=engine if engine == 'agent' else 'count')
+    infected_zones = InfectedZones(states, keys)
+    if engine == 'table' and store is not None:
+        infected_zones.subscribe(FlushObserver(states[keys[0]].sus.table))
+    if policies is not None:
+        apply_policies(infected_zones, policies)
+
+    first_state = random.choice(keys)
+    zones: Union[InfectedZones, VectorizedZones]
+    if engine == 'vectorized':
+        zones = VectorizedZones(states, keys, seed=seed)
+    elif engine in ('binomial', 'mean_field'):
+        zones = VectorizedZones(states, keys, seed=seed, mode=engine)
+    else:
+        zones = infected_zones
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        zones.add_state(states[first_state])
+
+    if isinstance(zones, VectorizedZones):
+        final = zones.get_numbers()
+    else:
+        final = np.array([[len(states[name].sus), len(states[name].inf), len(states[name].rem)]
+                          for name in keys], dtype=np.int64).reshape((len(keys), 3))
+    index = {name: i for i, name in enumerate(keys)}
+    infected_states = zones.get_infected_states()
+    edges = [sorted(index[name] for name in pair) for pair in zones.get_state_connections()]
+    return ReplicateResult(
+        seed=seed,
+        first_state=index[first_state],
+        days=zones.day,
+        final=final,
+        infected=np.array([name in infected_states for name in keys], dtype=bool),
+        edges=np.array(edges, dtype=np.int32).reshape((len(edges), 2))
+    )
+
+
+def run_ensemble(dataset: str, replicates: int, seed: Optional[int] = None, engine: str = 'count',
+                 policies: Optional[dict[str, list]] = None,
+                 max_workers: Optional[int] = None) -> list[ReplicateResult]:
+    """Run the given number of independently seeded replicates of the simulation on the given dataset,
+    and return their results in the order of the replicates.
+    The replicates are run in a pool of max_workers processes (the number of CPUs if None),
+    or in this process if max_workers is 1.
+
+    Preconditions:
+        - dataset is a valid path to the file
+        - replicates >= 0
+        - max_workers is None or max_workers >= 1
+
+    >>> results = run_ensemble('data/states_small.csv', 2, seed=0, max_workers=1)
+    >>> [r.seed for r in results] == replicate_seeds(0, 2)
+    True
+    """
+    seeds = replicate_seeds(seed, replicates)
+    args = ([dataset] * replicates, seeds, [engine] * replicates, [policies] * replicates)
+    if max_workers == 1:
+        return list(map(run_replicate, *args))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunksize = max(1, replicates // (4 * (max_workers or os.cpu_count() or 1)))
+        return list(executor.map(run_replicate, *args, chunksize=chunksize))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['contextlib', 'os', 'random', 'concurrent.futures', 'numpy', 'graph', 'observers',
+                          'simulations', 'vectorized'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998']
+    })
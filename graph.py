@@ -8,6 +8,11 @@ Using InfectedZones and State classes we can simulate how each state is affected
 outbreak internally, and how each state is contagious to each other,
 this file contains the most important functions and classes in our outbreak simulation.
 
+InfectedZones owns one day clock shared by all states. Each simulated day, every state whose infection
+process is running simulates one day, and the states that newly got infected start their infection process
+on the next day. So all states run on the same timeline, and no recursion is needed when a state infects
+another state.
+
 Copyright and Usage Information
 ===============================
 
@@ -19,46 +24,129 @@ expressly prohibited. :)
 This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
 """
 from __future__ import annotations
+import heapq
 import random
 import math
-from typing import Optional
+from typing import Optional, Union
+
+import numpy as np
 
-from sir_model import Person, Susceptible, Infective, Removal
+from sir_model import Person, Susceptible, Infective, Removal, SusceptibleCount, InfectiveCount, RemovalCount, \
+    AgentTable, SusceptibleTable, InfectiveTable, RemovalTable
+from spatial import SpatialIndex, great_circle_distance
+from recorder import Recorder
+from observers import DAILY_HOOKS, HOOKS, Observer
+from edges import EdgeStore
+from profiling import Profiler
 
 # Assume that if the amount of infective people reaches this value,
 # then this state has the capacity to infect another states.
 # you may edit this value freely
 TRANSMIT_THRESHOLD = 50
 
+# The classes of the groups of people (sus, inf and rem) of a State in each model of simulations.populate_states
+ENGINE_GROUPS = {'agent': (Susceptible, Infective, Removal),
+                 'count': (SusceptibleCount, InfectiveCount, RemovalCount),
+                 'table': (SusceptibleTable, InfectiveTable, RemovalTable)}
+# The groups of people of a State
+GROUPS = ('sus', 'inf', 'rem')
+
 
 class InfectedZones:
     """A graph representing the infected zones in the US.
 
+    Instance Attributes:
+        - day: The global day clock, the number of days simulated so far.
+        - recorder: The Recorder of the per-day numbers of every running state and the spread events,
+          or None if the simulation is not recorded.
+        - profiler: The Profiler measuring the time of each phase of the simulation,
+          or None if the simulation is not profiled.
+        - edges: The connections between the infected states, with the day and direction of the first infection
+          between every two connected states.
+        - stop_day: If not None, run pauses the simulation when the day clock reaches this day,
+          and the simulation can be continued by calling run again.
+        - adaptive: Whether run lets a quiescent state (see State.is_quiescent) simulate many days at once and
+          sleep until then, instead of simulating it day by day, with the same results.
+          It is only used when the simulation is not recorded and no observer has a per-day hook.
+          It is off by default, since the quiescent days are a small part of the work with the bundled datasets,
+          where choosing the next state to infect takes most of the time.
+
     Representation Invariants:
     - all(item == self._all_states[item].name for item in self._all_states)
     - set(self._all_states.keys()) == set(self._state_names)
     - set(self._infected_states.keys()) <= set(self._all_states.keys())
+    - all(state.during_infection for state in self._active)
 
     Private Instance Attributes:
         - _infected_states: A dictionary mapping each infected state's name to its corresponding State object.
         - _all_states: A dictionary mapping each state's name to its corresponding State object.
         - _state_names: A list of all state names.
+        - _active: The states whose infection process is running, in the order they started.
+        - _seeding: A priority queue of (day, order, state name) for the states whose infection process
+          starts on that day. order breaks ties, so states infected on the same day start in the order
+          they were infected.
+        - _scheduled: The number of infection processes scheduled so far.
+        - _running: Whether the simulation is currently running.
+        - _sleeping: A priority queue of (day, start order, state name) for the running states that have already
+          simulated their days until that day with State.advance_quiescent, and are not in _active until then.
+          It is empty whenever run is not running.
+        - _start_order: A dictionary mapping the name of every state whose infection process started to the order
+          it started in, so a state that wakes up goes back to its place in _active.
+        - _positions: A dictionary mapping each state's name to its index in _state_names.
+        - _spatial_index: The distances between all states, and the k-d tree for choosing the next state to infect,
+          which keeps the weight of every state as in State.get_target_weight.
+        - _observers: A dictionary mapping the name of each hook in observers.HOOKS to the subscribed observers
+          that override it.
     """
+    day: int
+    recorder: Optional[Recorder]
+    profiler: Optional[Profiler]
+    edges: EdgeStore
+    stop_day: Optional[int]
+    adaptive: bool
     _infected_states: dict[str, State]  # {state name: State object}
     _all_states: dict[str, State]
     _state_names: list[str]
-
-    def __init__(self, all_states: dict[str, State], state_names: list[str]) -> None:
+    _active: list[State]
+    _seeding: list[tuple[int, int, str]]
+    _scheduled: int
+    _running: bool
+    _sleeping: list[tuple[int, int, str]]
+    _start_order: dict[str, int]
+    _positions: dict[str, int]
+    _spatial_index: SpatialIndex
+    _observers: dict[str, list[Observer]]
+
+    def __init__(self, all_states: dict[str, State], state_names: list[str],
+                 recorder: Optional[Recorder] = None, profiler: Optional[Profiler] = None) -> None:
         """Initialize the graph with the dictionary mapping every selected state's name to State,
-        and a list of their name.
+        and a list of their name. If recorder is given, the simulation is recorded in it,
+        and if profiler is given, the time of each phase of the simulation is measured by it.
 
         Preconditions:
             - set(all_states.keys()) == set(state_names)
             - all(isinstance(s, State) for s in all_states.values())
         """
+        self.day = 0
+        self.recorder = recorder
+        self.profiler = profiler
+        self.edges = EdgeStore()
+        self.stop_day = None
+        self.adaptive = False
         self._infected_states = {}
         self._all_states = all_states
         self._state_names = state_names
+        self._active = []
+        self._seeding = []
+        self._scheduled = 0
+        self._running = False
+        self._sleeping = []
+        self._start_order = {}
+        self._positions = {name: i for i, name in enumerate(state_names)}
+        self._spatial_index = SpatialIndex([all_states[name].location for name in state_names])
+        for state_name in state_names:
+            self.update_target(all_states[state_name])
+        self._observers = {hook: [] for hook in HOOKS}
 
     def get_infected_states(self) -> dict[str, State]:
         """Return a dictionary mapping each infected state's name to State.
@@ -76,20 +164,232 @@ class InfectedZones:
     def add_state(self, state: State) -> None:
         """Add a new infected state with the given information to the infected zones.
         After a state is infected, the state begins its infection process.
+        If the state's during_infection is True, the state will only get another patient zero,
+        and its infection process will not start again.
+
+        If the simulation is not running yet, the infection process starts on the current day and
+        the simulation runs until every infection process finishes.
+        Otherwise, the infection process starts on the next day.
+
+        Preconditions:
+            - isinstance(state, State)
+        """
+        if self._running:
+            self.infect_state(state, self.day + 1)
+            return None
+        if self.infect_state(state, self.day):
+            return self.run()
+        return None
+
+    def infect_state(self, state: State, day: int) -> bool:
+        """Add a new infected state with the given information to the infected zones as in add_state,
+        but only schedule its infection process to start on the given day instead of running the simulation.
+        Return whether a new infection process was scheduled.
 
         Preconditions:
             - isinstance(state, State)
-            - state.name not in self._infected_states
+            - day >= self.day
         """
         self._infected_states[state.name] = state
         patient_zero = state.get_patient_zero()
-        if patient_zero is None:
-            return None
-        else:
-            return state.infection_process(self, self._all_states, self._state_names, set())
+        self.update_target(state)
+        self._notify('on_state_infected', state)
+        if patient_zero is None or state.during_infection:
+            return False
+        state.during_infection = True
+        self.schedule_state(state.name, day)
+        return True
+
+    def is_finished(self) -> bool:
+        """Return whether there is no running or scheduled infection process."""
+        return not self._active and not self._seeding and not self._sleeping
+
+    def schedule_state(self, state_name: str, day: int) -> None:
+        """Schedule the infection process of the state with the given name to start on the given day.
+
+        Preconditions:
+            - state_name in self._all_states
+            - day >= self.day
+        """
+        heapq.heappush(self._seeding, (day, self._scheduled, state_name))
+        self._scheduled += 1
+
+    def run(self) -> None:
+        """Simulate every infected state day by day, until there is no running or scheduled infection process,
+        or until the day clock reaches stop_day.
+
+        On each day, every running state simulates one day of its infection process first,
+        then the states that reached the threshold try to infect other states in the order they started.
+        If adaptive is True, a quiescent state simulates its days at once and sleeps until it has simulated them
+        (see _put_to_sleep), so the days of the other states do not need to go through it.
+
+        >>> s1 = State("state1", SusceptibleCount(1000), 0.4, 0.0005, (0, 0), InfectiveCount(), RemovalCount())
+        >>> iz = InfectedZones({"state1": s1}, ["state1"])
+        >>> iz.stop_day = 20
+        >>> iz.add_state(s1)
+        >>> iz.day, iz.is_finished()
+        (20, False)
+        >>> iz.stop_day = None
+        >>> iz.run()
+        >>> iz.is_finished(), s1
+        (True, state1: S=0, I=0, R=1000)
+
+        Letting quiescent states sleep gives the same simulation in every model, also when it is profiled.
+
+        >>> from simulations import populate_states
+        >>> for engine in ENGINE_GROUPS:
+        ...     results = []
+        ...     for adaptive in (False, True):
+        ...         random.seed(1)
+        ...         states, keys = populate_states('data/states_small.csv', engine=engine)
+        ...         zones = InfectedZones(states, keys)
+        ...         zones.adaptive = adaptive
+        ...         zones.profiler = Profiler() if adaptive else None
+        ...         zones.add_state(states[keys[0]])
+        ...         results.append((zones.day, zones.edges.rows(), [repr(states[key]) for key in keys]))
+        ...     print(engine, results[0] == results[1], zones.profiler.calls('increment_day') > 0)
+        agent True True
+        count True True
+        table True True
+        """
+        self._running = True
+        # The states may have been changed since this InfectedZones was created.
+        for state_name in self._state_names:
+            self.update_target(self._all_states[state_name])
+        if self.profiler is not None:
+            for state_name in self._state_names:
+                self.profiler.wrap(self._all_states[state_name])
+        try:
+            while (self._active or self._seeding or self._sleeping) and \
+                    (self.stop_day is None or self.day < self.stop_day):
+                self._simulate_day()
+            # The sleeping states never sleep past stop_day, so they can all be woken up when pausing.
+            self._wake_up(self.day)
+        finally:
+            if self.profiler is not None:
+                for state_name in self._state_names:
+                    self.profiler.unwrap(self._all_states[state_name])
+            self._running = False
+
+    def _simulate_day(self) -> None:
+        """Simulate the current day, or skip to the next day a state starts its infection process
+        if there is no running state.
+        """
+        # Start the infection processes scheduled for today.
+        while self._seeding and self._seeding[0][0] <= self.day:
+            _, _, state_name = heapq.heappop(self._seeding)
+            self._start_order.setdefault(state_name, len(self._start_order))
+            self._active.append(self._all_states[state_name])
+        if self._sleeping and self._sleeping[0][0] <= self.day:
+            self._wake_up(self.day)
+
+        # An infection process finishes when there's no infected people in the state.
+        still_active = []
+        for state in self._active:
+            if len(state.inf) > 0:
+                still_active.append(state)
+            else:
+                self._notify('on_state_cleared', state)
+        self._active = still_active
+        if not self._active:
+            days = [queue[0][0] for queue in (self._seeding, self._sleeping) if queue]
+            if days:
+                self.day = min(days) if self.stop_day is None else min(min(days), self.stop_day)
+            return
+
+        if self._observers['on_state_day']:
+            for state in self._active:
+                self._notify('on_state_day', state)
+        spreading = [state for state in self._active if state.infection_process()]
+        for state in self._active:
+            self.update_target(state)
+        if self.recorder is not None:
+            for state in self._active:
+                self.recorder.record_day(self.day, self._positions[state.name], len(state.sus), len(state.inf),
+                                         len(state.rem), state.new_infected, state.new_removed)
+        for state in spreading:
+            if self.profiler is None:
+                state.infect_next_state(self)
+            else:
+                with self.profiler.time('infect_next_state', state.name):
+                    state.infect_next_state(self)
+        self._notify('on_day_end', self.day)
+        self.day += 1
+        if self.adaptive and self.recorder is None and not self._observers['on_state_day'] \
+                and not self._observers['on_day_end']:
+            self._put_to_sleep()
+
+    def _put_to_sleep(self) -> None:
+        """Let every running quiescent state simulate its days from today at once, and take the ones that
+        simulated any day out of _active until they have caught up with the day clock.
+
+        A quiescent state cannot infect another state, and its numbers only matter to the other states through
+        its susceptible people, of which it has none, so simulating its days early gives the same results.
+        The days of the count-based states are simulated until they have no infected people, and the days of
+        the other states only while nobody of them is recoverable, because removing people from them draws
+        random numbers that must stay in the order of the normal days (see State.advance_quiescent).
+        No state sleeps past stop_day, so a paused simulation has no sleeping state.
+        """
+        limit = math.inf if self.stop_day is None else self.stop_day - self.day
+        still_active = []
+        for state in self._active:
+            days = state.advance_quiescent(limit) if state.is_quiescent() else 0
+            if days > 0:
+                heapq.heappush(self._sleeping, (self.day + days, self._start_order[state.name], state.name))
+            else:
+                still_active.append(state)
+        self._active = still_active
+
+    def _wake_up(self, day: int) -> None:
+        """Put the sleeping states that have simulated their days until the given day back into _active,
+        at their places in the order the states started.
+        """
+        if not self._sleeping or self._sleeping[0][0] > day:
+            return
+        woken = []
+        while self._sleeping and self._sleeping[0][0] <= day:
+            woken.append(self._all_states[heapq.heappop(self._sleeping)[2]])
+        self._active = sorted(self._active + woken, key=lambda state: self._start_order[state.name])
+
+    def subscribe(self, observer: Observer) -> None:
+        """Subscribe the given observer to the hooks it overrides.
+
+        >>> s1 = State("state1", SusceptibleCount(1000), 0.4, 0.0005, (0, 0), InfectiveCount(), RemovalCount())
+        >>> iz = InfectedZones({"state1": s1}, ["state1"])
+        >>> from observers import ConsoleObserver
+        >>> iz.subscribe(ConsoleObserver(interval=10))
+        >>> iz.add_state(s1)
+        --- ('state1', 999, 1, 0) ----
+        --- ('state1', 910, 90, 0) ----
+        --- ('state1', 57, 934, 9) ----
+        --- ('state1', 0, 654, 346) ----
+        --- ('state1', 0, 17, 983) ----
+        All Removed: ('state1', 0, 0, 1000)
+        """
+        for hook in observer.hooks():
+            self._observers[hook].append(observer)
 
-    def add_edge(self, state1_name: str, state2_name: str) -> None:
-        """Add an edge between the two states with the given name in InfectedZones.
+    def unsubscribe(self, observer: Observer) -> None:
+        """Unsubscribe the given observer.
+
+        Preconditions:
+            - observer has been subscribed to this InfectedZones
+        """
+        for hook in observer.hooks():
+            self._observers[hook].remove(observer)
+
+    def _notify(self, hook: str, *args) -> None:
+        """Call the given hook of every observer subscribed to it with this InfectedZones and args.
+        The per-day hooks are only called on the days that are multiples of the observer's interval.
+        """
+        for observer in self._observers[hook]:
+            if hook not in DAILY_HOOKS or self.day % observer.interval == 0:
+                getattr(observer, hook)(self, *args)
+
+    def add_edge(self, state1_name: str, state2_name: str, day: Optional[int] = None) -> None:
+        """Add an edge between the two states with the given name in InfectedZones,
+        made by the state named state1_name infecting the state named state2_name on the given day (today if None).
+        The observers are only notified if the two states were not connected yet.
 
         Raise a ValueError if state1_name or state2_name is not an infected state in the InfectedZones.
 
@@ -103,6 +403,8 @@ class InfectedZones:
             v2 = self._infected_states[state2_name]
             v1.neighbours.add(v2)
             v2.neighbours.add(v1)
+            if self.edges.add(self.day if day is None else day, state1_name, state2_name):
+                self._notify('on_edge_added', state1_name, state2_name)
         else:
             raise ValueError
 
@@ -136,6 +438,17 @@ class InfectedZones:
         elif target.a >= 1.0:
             target.a = 1.0
 
+    def record_spread(self, source_name: str, target_name: str) -> None:
+        """Record that the state named source_name infected the state named target_name today,
+        if the simulation is recorded.
+
+        Preconditions:
+            - source_name in self._all_states
+            - target_name in self._all_states
+        """
+        if self.recorder is not None:
+            self.recorder.record_spread(self.day, self._positions[source_name], self._positions[target_name])
+
     def movement_prohibited(self, state_name: str) -> None:
         """Change the state's lockdown policy to True.
 
@@ -155,18 +468,146 @@ class InfectedZones:
         """
         target = self._all_states[state_name]
         target.lockdown = True
+        self.update_target(target)
+
+    def update_target(self, state: State) -> None:
+        """Update the weight of the given state for choosing the next state to infect.
+        This must be called whenever the state's lockdown, or the number of its susceptible or infective people
+        changes, which InfectedZones does for the changes made by itself.
+
+        Preconditions:
+            - state.name in self._all_states
+        """
+        weight = None if len(state.sus) == 0 else state.get_target_weight()
+        self._spatial_index.set_weight(self._positions[state.name], weight)
+
+    def get_distance(self, state1_name: str, state2_name: str) -> float:
+        """Return the great-circle distance in degrees of arc between the two states with the given names,
+        computed when this InfectedZones was created.
+
+        Preconditions:
+            - state1_name in self._all_states
+            - state2_name in self._all_states
+        """
+        return float(self._spatial_index.distances[self._positions[state1_name], self._positions[state2_name]])
+
+    def get_best_targets(self, state: State) -> list[State]:
+        """Return the states with the minimum score according to the given state (as in State.compute_state_score),
+        among the other states that have susceptible people, in the order of the state names.
+
+        Preconditions:
+            - state.name in self._all_states
+
+        >>> s1 = State("state1", Susceptible([Person(1)]), 0.05, 0.3, (40.0, -80.0))
+        >>> s2 = State("state2", Susceptible([Person(2)]), 0.02, 0.5, (41.0, -80.0))
+        >>> s3 = State("state3", Susceptible([Person(3)]), 0.02, 0.5, (30.0, -100.0))
+        >>> iz = InfectedZones({"state1": s1, "state2": s2, "state3": s3}, ["state1", "state2", "state3"])
+        >>> iz.get_best_targets(s1)
+        [state2: S=1, I=0, R=0]
+        >>> iz.movement_prohibited("state2")
+        >>> iz.get_best_targets(s1)
+        [state3: S=1, I=0, R=0]
+        """
+        best = self._spatial_index.best(self._positions[state.name])
+        return [self._all_states[self._state_names[j]] for j in best]
 
     def get_state_connections(self) -> list[set[str, str]]:
         """Return a list of all connected states, each pair is represented by a set containing the two
-        connected states' name.
+        connected states' name, in the order they were connected.
+        """
+        return [set(pair) for pair in self.edges.pairs()]
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the whole simulation as a dictionary of arrays, which from_snapshot creates the same
+        simulation from: the day clock, the scheduled infection processes, the connections, and the policies,
+        rates, status and groups of people of every state. The recorder, the profiler and the observers
+        are not part of it.
+
+        Preconditions:
+            - not self._running
+            - the states are populated with one of the models in ENGINE_GROUPS
+        """
+        states = [self._all_states[name] for name in self._state_names]
+        engine = next(name for name, groups in ENGINE_GROUPS.items() if isinstance(states[0].sus, groups[0]))
+        arrays = {
+            'engine': np.array(engine),
+            'names': np.array(self._state_names),
+            'locations': np.array([state.location for state in states], dtype=np.float64).reshape((len(states), 2)),
+            'rates': np.array([[state.a, state.r, state.isolation, state.maskwearing, state.vaccination]
+                               for state in states], dtype=np.float64).reshape((len(states), 5)),
+            'status': np.array([[state.lockdown, state.during_infection, state.new_infected, state.new_removed]
+                                for state in states], dtype=np.int64).reshape((len(states), 4)),
+            'clock': np.array([self.day, self._scheduled], dtype=np.int64),
+            'infected': np.array([self._positions[name] for name in self._infected_states], dtype=np.int64),
+            'active': np.array([self._positions[state.name] for state in self._active], dtype=np.int64),
+            'seeding': np.array([(day, order, self._positions[name]) for day, order, name in self._seeding],
+                                dtype=np.int64).reshape((len(self._seeding), 3)),
+            'edges': np.array([(day, self._positions[source], self._positions[target])
+                               for day, source, target in self.edges.rows()], dtype=np.int64).reshape((-1, 3))
+        }
+        for i, state in enumerate(states):
+            for group in GROUPS:
+                for key, value in getattr(state, group).snapshot().items():
+                    arrays[f'state{i}.{group}.{key}'] = value
+        if engine == 'table':
+            for key, value in states[0].sus.table.snapshot().items():
+                arrays[f'table.{key}'] = value
+        return arrays
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray], store: Optional[str] = None) -> InfectedZones:
+        """Return a simulation with the content returned by snapshot, with new State objects.
+        It continues exactly like the simulation snapshot was called on when run is called,
+        if the random module has the same state as well.
+        In the agent table model, the people are copied to memory-mapped files in the folder with the path store
+        if it is given, otherwise the table uses the arrays of the snapshot.
+
+        Preconditions:
+            - arrays was returned by InfectedZones.snapshot (or loaded from a file it was saved to)
+
+        >>> s1 = State("state1", SusceptibleCount(1000), 0.4, 0.0005, (0, 0), InfectiveCount(), RemovalCount())
+        >>> iz = InfectedZones({"state1": s1}, ["state1"])
+        >>> iz.stop_day = 20
+        >>> iz.add_state(s1)
+        >>> copy = InfectedZones.from_snapshot(iz.snapshot())
+        >>> copy.day, copy.get_infected_states()
+        (20, {'state1': state1: S=57, I=934, R=9})
         """
-        lst = []
-        for state_name in self._infected_states:
-            for other_state_object in self._infected_states[state_name].neighbours:
-                new_pair = {state_name, other_state_object.name}
-                if new_pair not in lst:
-                    lst.append(new_pair)
-        return lst
+        names = arrays['names'].tolist()
+        engine = str(arrays['engine'])
+        table = None
+        if engine == 'table':
+            table = AgentTable.from_snapshot({key[len('table.'):]: value for key, value in arrays.items()
+                                              if key.startswith('table.')}, store)
+        groups = {}
+        for key, value in arrays.items():
+            if key.startswith('state'):
+                state_key, group, name = key.split('.', 2)
+                groups.setdefault((int(state_key[len('state'):]), group), {})[name] = value
+
+        all_states = {}
+        for i, name in enumerate(names):
+            people = [group_class.from_snapshot(groups[(i, group)]) if table is None
+                      else group_class.from_snapshot(groups[(i, group)], table)
+                      for group, group_class in zip(GROUPS, ENGINE_GROUPS[engine])]
+            a, r, isolation, maskwearing, vaccination = arrays['rates'][i].tolist()
+            state = State(name, people[0], a, r, tuple(arrays['locations'][i].tolist()), people[1], people[2])
+            state.isolation, state.maskwearing, state.vaccination = isolation, maskwearing, vaccination
+            lockdown, during_infection, state.new_infected, state.new_removed = arrays['status'][i].tolist()
+            state.lockdown, state.during_infection = bool(lockdown), bool(during_infection)
+            all_states[name] = state
+
+        zones = cls(all_states, names)
+        zones.day, zones._scheduled = arrays['clock'].tolist()
+        zones._infected_states = {names[i]: all_states[names[i]] for i in arrays['infected'].tolist()}
+        zones._active = [all_states[names[i]] for i in arrays['active'].tolist()]
+        zones._start_order = {state.name: i for i, state in enumerate(zones._active)}
+        zones._seeding = [(day, order, names[i]) for day, order, i in arrays['seeding'].tolist()]
+        for day, source, target in arrays['edges'].tolist():
+            zones.edges.add(day, names[source], names[target])
+            all_states[names[source]].neighbours.add(all_states[names[target]])
+            all_states[names[target]].neighbours.add(all_states[names[source]])
+        return zones
 
 
 class State:
@@ -177,6 +618,8 @@ class State:
     - sus: Susceptible objects specific for this state
     - inf: Infective objects specific for this state
     - rem: Removal objects specific for this state
+      (sus, inf and rem are SusceptibleCount, InfectiveCount and RemovalCount in the count-based model,
+      and SusceptibleTable, InfectiveTable and RemovalTable in the agent table model)
     - a: rate of removal
     - r: rate of contact
     - isolation: the index of isolation for this state
@@ -185,7 +628,9 @@ class State:
     - lockdown: whether this state is free for interstate travel
     - neighbours: a set of State object of all the state that is infected by this state or infect this state
     - location: a tuple for representing the state's latitude and longitude
-    - during_infection: a boolean that tells if a state is currently infected
+    - during_infection: a boolean that tells if a state's infection process has started
+    - new_infected: the number of people infected on the last simulated day of this state
+    - new_removed: the number of people removed on the last simulated day of this state
 
 
     Representation Invariants:
@@ -197,9 +642,9 @@ class State:
     - 1.0 <= vaccination <= 10.0
     """
     name: str
-    sus: Susceptible
-    inf: Infective
-    rem: Removal
+    sus: Union[Susceptible, SusceptibleCount]
+    inf: Union[Infective, InfectiveCount]
+    rem: Union[Removal, RemovalCount]
     a: float  # rate recovery
     r: float  # rate of contact
     # Human input:
@@ -212,19 +657,25 @@ class State:
     neighbours: set
     location: tuple[float, float]   # Simulation Essential
     during_infection: bool
+    new_infected: int
+    new_removed: int
 
-    def __init__(self, name: str, sus: Susceptible, a: float, r: float, location: tuple[float, float]) -> None:
+    def __init__(self, name: str, sus: Union[Susceptible, SusceptibleCount], a: float, r: float,
+                 location: tuple[float, float], inf: Optional[Union[Infective, InfectiveCount]] = None,
+                 rem: Optional[Union[Removal, RemovalCount]] = None) -> None:
         """Initialize a state with the given information.
+        If inf or rem is not given, an empty Infective or Removal object is used.
 
         Preconditions:
         - name is a non-empty string.
         - 0 <= a <= 1.0
         - 0 <= r <= 1.0
+        - sus, inf and rem are all from the agent-based model or all from the count-based model
         """
         self.name = name
         self.sus = sus
-        self.inf = Infective([])
-        self.rem = Removal([])
+        self.inf = Infective([]) if inf is None else inf
+        self.rem = Removal([]) if rem is None else rem
         self.a = a
         self.r = r
 
@@ -236,78 +687,104 @@ class State:
         self.neighbours = set()
         self.location = location
         self.during_infection = False
+        self.new_infected = 0
+        self.new_removed = 0
 
     def __repr__(self) -> str:
         """Return a string representing this state."""
-        return f"{self.name}: S={len(self.sus.people)}, I={len(self.inf.people)}, R={len(self.rem.people)}"
+        return f"{self.name}: S={len(self.sus)}, I={len(self.inf)}, R={len(self.rem)}"
 
     def is_at_threshold(self) -> bool:
         """Return if a state is at threshold baseline, if it is True, then disease is able to spread to other states.
         We set the threshold as 1000 as an assumption.
         """
-        return len(self.inf.people) > TRANSMIT_THRESHOLD
+        return len(self.inf) > TRANSMIT_THRESHOLD
 
-    def infection_process(self, infected_zones: InfectedZones, dict_of_states: dict[str, State],
-                          lst_of_states: list[str], visited: set) -> None:
-        """Simulate the infection process and how the state infects other states.
-        If the state's during_infection is True,
-        the state will not be infected again until during_infection is False again.
-        This function is the main part of our simulation and calls many other functions.
+    def is_quiescent(self) -> bool:
+        """Return whether the infection process of this state only removes recoverable people from now on:
+        there is no susceptible people left to infect, and too few infected people to infect another state.
+        A quiescent state stays quiescent, and changes in the same way whatever the other states do.
+
+        >>> s = State("state1", SusceptibleCount(0), 0.4, 0.0005, (0, 0), InfectiveCount(30), RemovalCount())
+        >>> s.is_quiescent()
+        True
+        """
+        return len(self.sus) == 0 and len(self.inf) <= TRANSMIT_THRESHOLD
+
+    def advance_quiescent(self, days: float) -> int:
+        """Simulate at most the given number of days of the infection process of this quiescent state at once,
+        with the same results as calling infection_process on every day, and return the number of days simulated.
+        It stops once the state has no infected people.
+
+        In the count-based model, removing people needs no random numbers, so all the days are simulated.
+        In the other models, only the days on which nobody is recoverable are simulated, which only make the
+        infected people older, since removing people draws random numbers that must stay in the order of the
+        normal days of all states.
 
         Preconditions:
-            - infected_zones is a valid InfectedZones object
-            - dict_of_states is a dictionary where the keys are valid state names and \
-                the values are valid State objects
-            - lst_of_states is a list of valid state names
-            - visited is a set containing the names of the states that have been visited
+            - self.is_quiescent()
+            - days >= 0
+
+        >>> s = State("state1", SusceptibleCount(0), 0.5, 0.0005, (0, 0), InfectiveCount(30), RemovalCount())
+        >>> s.advance_quiescent(16), s, s.new_removed
+        (16, state1: S=0, I=15, R=15, 15)
+        >>> s.advance_quiescent(math.inf), s
+        (4, state1: S=0, I=0, R=30)
+        >>> t = State("state2", Susceptible([]), 0.5, 0.0005, (0, 0), Infective([Person(1)]))
+        >>> t.advance_quiescent(math.inf), t.inf.num_recoverable()
+        (15, 1)
+        """
+        simulated, removed, last_removed = self.inf.advance_quiescent(self.a, days)
+        self.rem.add_multiple(removed)
+        if simulated > 0:
+            self.new_infected = 0
+            self.new_removed = last_removed
+        return simulated
+
+    def infection_process(self) -> bool:
+        """Simulate one day of the infection process in this state.
+        Return whether the state tries to infect another state on this day.
+        This function is the main part of our simulation, and it is called by InfectedZones.run
+        for every running state on every day.
 
-        Notes:
-            this is a recursive function, if self is currectly infected,
-            there's no need to start the recursion again,
-            since we have already mutate self.neighbours to point out
-            which state infected self in the following methods.
-        """
-        i = 0
-        # If a state is infected, set state.during_infection be True.
-        if self.during_infection is False:
-            self.during_infection = True
-        else:
-            return None
+        Preconditions:
+            - len(self.inf) > 0
 
-        # Use visited attribute to make self cannot infect a same state again.
-        visited = visited.union({self.name})
-
-        # Loop ends if there's no infected people in a state.
-        while len(self.inf.people) > 0:
-            print(f"--- {self.name, len(self.sus.people), len(self.inf.people), len(self.rem.people)} ----")
-
-            # Calculation of the number of sick and recovered people according to the SIR model.
-            num_of_infected = math.ceil(self.r * len(self.inf.people) * len(self.sus.people))
-            infected_people = self.sus.remove_by_number(num_of_infected)
-            self.inf.add_multiple(infected_people)
-            num_of_recovery = math.ceil(self.a * len(self.inf.get_recoverable()))
-            removed_people = self.inf.remove_by_number(num_of_recovery)
-            self.rem.add_multiple(removed_people)
-
-            # Only when num of infected is large enough, namely > transmit_threshold it can infect another state.
-            if len(self.inf.people) > TRANSMIT_THRESHOLD and self.lockdown is False:
-                self.infect_next_state(infected_zones, dict_of_states, lst_of_states, visited)
-            # If a state's lockdown is True, it's hard to infect another state,
-            # so we decide that there is only 10 percent possibility to infect another state.
-            elif len(self.inf.people) > TRANSMIT_THRESHOLD and self.lockdown is True:
-                p = random.uniform(0, 1)
-                if p < 0.1:
-                    self.infect_next_state(infected_zones, dict_of_states, lst_of_states, visited)
-
-            # For infected people, add their infected time by one,
-            # notice that only when infected time > 14 they are possible to recover.
-            self.inf.increment_day()
-            i += 1
-
-        print(f'All Removed: {self.name, len(self.sus.people), len(self.inf.people), len(self.rem.people)}')
-
-    def get_patient_zero(self) -> Optional[Person]:
-        """Return a random Person object from the Susceptible group.
+        >>> s = State("state1", SusceptibleCount(1000), 0.4, 0.0005, (0, 0), InfectiveCount(60), RemovalCount())
+        >>> s.infection_process()
+        True
+        >>> s
+        state1: S=970, I=90, R=0
+        """
+        # Calculation of the number of sick and recovered people according to the SIR model.
+        # In the count-based model, the groups exchange numbers of people instead of Person objects.
+        num_of_sus, num_of_rem = len(self.sus), len(self.rem)
+        num_of_infected = math.ceil(self.r * len(self.inf) * len(self.sus))
+        infected_people = self.sus.remove_by_number(num_of_infected)
+        self.inf.add_multiple(infected_people)
+        num_of_recovery = math.ceil(self.a * self.inf.num_recoverable())
+        removed_people = self.inf.remove_by_number(num_of_recovery)
+        self.rem.add_multiple(removed_people)
+        self.new_infected = num_of_sus - len(self.sus)
+        self.new_removed = len(self.rem) - num_of_rem
+
+        # For infected people, add their infected time by one,
+        # notice that only when infected time > 14 they are possible to recover.
+        self.inf.increment_day()
+
+        # Only when num of infected is large enough, namely > transmit_threshold it can infect another state.
+        # If a state's lockdown is True, it's hard to infect another state,
+        # so we decide that there is only 10 percent possibility to infect another state.
+        if len(self.inf) > TRANSMIT_THRESHOLD and self.lockdown is False:
+            return True
+        elif len(self.inf) > TRANSMIT_THRESHOLD and self.lockdown is True:
+            return random.uniform(0, 1) < 0.1
+        return False
+
+    def get_patient_zero(self) -> Optional[Union[Person, int]]:
+        """Return a random Person object from the Susceptible group, after moving it to the Infective group.
+        In the count-based model there is no Person object, so the number of people moved (1) is returned,
+        and in the agent table model, the id of the person is returned.
         If the Susceptible group is empty, then return None.
 
         >>> s1 = State("state1", Susceptible([Person(1)]), 0.05, 0.3, (100, 100))
@@ -317,17 +794,23 @@ class State:
         0
         >>> len(s1.inf.people)
         1
+        >>> s2 = State("state2", SusceptibleCount(5), 0.05, 0.3, (100, 100), InfectiveCount(), RemovalCount())
+        >>> s2.get_patient_zero()
+        1
+        >>> s2
+        state2: S=4, I=1, R=0
         """
-        keys = list(self.sus.people)
-        if not keys:
+        if len(self.sus) == 0:
             return None
-        patient_zero = self.sus.people[random.choice(keys)]
-        self.inf.add(patient_zero)
-        self.sus.remove(patient_zero)
+        patient_zero = self.sus.remove_by_number(1)
+        self.inf.add_multiple(patient_zero)
+        if isinstance(patient_zero, list):
+            return patient_zero[0]
+        if isinstance(patient_zero, np.ndarray):
+            return int(patient_zero[0])
         return patient_zero
 
-    def infect_next_state(self, infected_zones: InfectedZones, dict_of_states: dict[str, State],
-                          lst_of_states: list[str], visited: set[str]) -> None:
+    def infect_next_state(self, infected_zones: InfectedZones) -> None:
         """Choose the next state to infect using an algorithm below.
 
             1. Find every other state other than self.
@@ -335,49 +818,55 @@ class State:
                If there is only one state with the minimum score, choose that state. Otherwise, continue.
             3. Find the state from the states after screening for the minimum score that is at the least
                distance. If there is only one closest, choose that one. Otherwise randomly choose one.
+
+        The states with the minimum score are found with InfectedZones.get_best_targets,
+        which does not need to score every other state.
+        Only self is left out of the other states, as in the recursive infection process this replaced,
+        where every state started its process with only itself visited. So a state may infect
+        the state that infected it, or that state's ancestors, if they still have susceptible people.
+
+        >>> s1 = State("state1", SusceptibleCount(1000), 0.4, 0.0005, (40.0, -80.0), InfectiveCount(), RemovalCount())
+        >>> s2 = State("state2", SusceptibleCount(1000), 0.4, 0.0005, (41.0, -80.0), InfectiveCount(), RemovalCount())
+        >>> s3 = State("state3", SusceptibleCount(1000), 0.4, 0.0005, (30.0, -100.0), InfectiveCount(), RemovalCount())
+        >>> iz = InfectedZones({"state1": s1, "state2": s2, "state3": s3}, ["state1", "state2", "state3"])
+        >>> iz.stop_day = 0
+        >>> iz.add_state(s1)
+        >>> s1.infect_next_state(iz)
+        >>> s2.during_infection
+        True
+        >>> iz.get_best_targets(s2)
+        [state1: S=999, I=1, R=0]
         """
-        states = self.get_other_states(dict_of_states, lst_of_states, visited)
-        if not states:
+        candidates = infected_zones.get_best_targets(self)
+        if not candidates:
             return None
 
-        min_score = min([self.compute_state_score(state) for state in states])
-        candidates = [state for state in states if self.compute_state_score(state) == min_score]
         if len(candidates) == 1:
             next_state = candidates[0]
-            infected_zones.add_state(next_state)
-            infected_zones.add_edge(self.name, next_state.name)
-            return None
-
-        min_distance = min([self.get_distance(state) for state in candidates])
-        finalists = [state for state in candidates if self.get_distance(state) == min_distance]
+        else:
+            distances = [infected_zones.get_distance(self.name, state.name) for state in candidates]
+            min_distance = min(distances)
+            finalists = [state for state, distance in zip(candidates, distances) if distance == min_distance]
+            next_state = random.choice(finalists)
 
-        next_state = random.choice(finalists)
         infected_zones.add_state(next_state)
         infected_zones.add_edge(self.name, next_state.name)
+        infected_zones.record_spread(self.name, next_state.name)
         return None
 
-    def get_other_states(self, dict_of_states: dict[str, State], lst_of_states: list[str],
-                         visited: set[str]) -> list[State]:
-        """Return a list of states, not including the current state, this method helps to determine
-        what other states can the current state infect.
-
-        >>> s1 = State("state1", Susceptible([Person(1)]), 0.05, 0.3, (100, 100))
-        >>> s2 = State("state2", Susceptible([Person(2)]), 0.02, 0.5, (200, 200))
-        >>> s1.get_other_states({'state1': s1, "state2": s2}, ["state1", "state2"], {s1.name})
-        [state2: S=1, I=0, R=0]
-        """
-        return [dict_of_states[state_name] for state_name in lst_of_states if
-                state_name not in visited and len(dict_of_states[state_name].sus.people) != 0]
-
     def get_distance(self, other_state: State) -> float:
-        """Measure the distance between two states using the location attribute initialized.
+        """Measure the great-circle distance in degrees of arc between two states using the location attribute
+        initialized.
 
         Preconditions:
             - other_state is a valid State object
+
+        >>> s1 = State("state1", Susceptible([]), 0.05, 0.3, (0.0, 0.0))
+        >>> s2 = State("state2", Susceptible([]), 0.05, 0.3, (0.0, 90.0))
+        >>> round(s1.get_distance(s2), 6)
+        90.0
         """
-        x1, y1 = other_state.location
-        x2, y2 = other_state.location
-        return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+        return great_circle_distance(self.location, other_state.location)
 
     def compute_state_score(self, other_state: State) -> float:
         """Details of the algorithm can be referred from the docstring in infect_next_state()
@@ -390,12 +879,22 @@ class State:
             we also consider whether the other state is on lockdown and
             the ratio of the number of people infected to the number of people who can be infected in a state.
         """
-        inf_score = len(other_state.inf.people) / len(other_state.sus.people)
-        if other_state.lockdown:
+        return self.get_distance(other_state) + other_state.get_target_weight()
+
+    def get_target_weight(self) -> float:
+        """Return the part of this state's score in compute_state_score that does not depend on the distance,
+        namely its lockdown and the ratio of the number of people infected to the number of people who can be
+        infected.
+
+        Preconditions:
+            - len(self.sus) > 0
+        """
+        inf_score = len(self.inf) / len(self.sus)
+        if self.lockdown:
             interstate_score = 50
         else:
             interstate_score = 0
-        return interstate_score + self.get_distance(other_state) + inf_score
+        return interstate_score + inf_score
 
 
 if __name__ == '__main__':
@@ -405,6 +904,6 @@ if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['random'],
+        'extra-imports': ['random', 'numpy', 'spatial', 'recorder', 'observers', 'edges', 'profiling'],
         'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998']
     })
@@ -24,10 +24,14 @@ expressly prohibited. :)
 This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
 """
 
+import argparse
 import random
+from typing import Optional
 from graph import InfectedZones
+from observers import ConsoleObserver
+from profiling import Profiler
 from plotter import plot_diagram
-from simulations import get_user_input, graph_to_csv, populate_states
+from simulations import apply_policies, get_edge_rows, get_user_input, graph_to_csv, populate_states
 
 # Dataset of the states the user decides test and observe (Changeable to see other datasets)
 # Using DATASET = 'states_full.csv' is not recommended, it is created using actual data,
@@ -35,35 +39,44 @@ from simulations import get_user_input, graph_to_csv, populate_states
 DATASET = 'data/states_full_people_not_full.csv'
 
 
-def main() -> None:
+def main(profile: bool = False) -> None:
     """Main method of the program.
     Its job is to call populate_states, get user input on the variety parameters in each state to kick
     -start the simulation.
+    If profile is True, the time of each phase of the simulation and of saving the csv file is measured,
+    and a report is printed before plotting.
     """
+    profiler: Optional[Profiler] = Profiler() if profile else None
+
     # Populate States
     states, keys = populate_states(DATASET)
-    infected_zones = InfectedZones(states, keys)
+    infected_zones = InfectedZones(states, keys, profiler=profiler)
+    infected_zones.subscribe(ConsoleObserver())
 
     # GET INPUT AND ADJUST PARAMETERS
     input_dict = get_user_input(keys)
     if input_dict is not None:
-        for key in input_dict:
-            infected_zones.change_a_and_r(state_name=key,
-                                          isolation_degree=input_dict[key][0],
-                                          maskwearing_degree=input_dict[key][1],
-                                          vaccination_degree=input_dict[key][2])
-            if input_dict[key][3]:
-                infected_zones.movement_prohibited(state_name=key)
+        apply_policies(infected_zones, input_dict)
 
     # START SIM
     # Pick one unlucky state and start internal infection
     key = random.choice(keys)
     infected_zones.add_state(states[key])
 
-    file_path = graph_to_csv(infected_zones)
-    # Plot Graph
-    plot_diagram(DATASET, file_path)
+    edges = get_edge_rows(infected_zones)
+    if profiler is None:
+        graph_to_csv(infected_zones, edges)
+    else:
+        with profiler.time('csv_export'):
+            graph_to_csv(infected_zones, edges)
+        print(profiler.report())
+
+    # Plot Graph, from the edges in memory instead of reading the csv file again
+    plot_diagram(DATASET, edges)
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Simulate the spread of COVID-19 between the states.')
+    parser.add_argument('--profile', action='store_true',
+                        help='measure the time of each phase of the simulation and print a report')
+    main(profile=parser.parse_args().profile)
@@ -0,0 +1,136 @@
+"""CSC111 Winter 2023 Course Project: Observers
+
+Instructions
+===============================
+
+This Python module contains the Observer class, the base class of everything that watches a simulation,
+such as progress bars, metrics exporters or recorders, ConsoleObserver, which prints the progress
+of the simulation, and FlushObserver, which bounds the memory used by an AgentTable stored in files.
+An observer is subscribed to an InfectedZones with InfectedZones.subscribe,
+and InfectedZones calls its hooks during the simulation:
+
+- on_state_day: before a running state simulates a day, with the state
+- on_day_end: at the end of every day
+- on_state_infected: when a state gets infected
+- on_edge_added: when an edge between two states is added
+- on_state_cleared: when the infection process of a state finishes
+
+An observer only overrides the hooks it needs, and InfectedZones only calls the overridden ones,
+so a simulation without observers does not pay for the hooks. The per-day hooks (on_state_day and on_day_end)
+are only called on every interval-th day, where interval is set when the observer is created.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graph import InfectedZones, State
+    from sir_model import AgentTable
+
+# The names of the hooks of an observer
+HOOKS = ('on_state_day', 'on_day_end', 'on_state_infected', 'on_edge_added', 'on_state_cleared')
+# The hooks that are only called on every interval-th day
+DAILY_HOOKS = ('on_state_day', 'on_day_end')
+
+
+class Observer:
+    """An observer of a simulation. Every hook does nothing unless it is overridden by a subclass.
+
+    Instance Attributes
+    - interval: the per-day hooks are only called on the days that are multiples of interval
+
+    Representation Invariants:
+    - self.interval >= 1
+    """
+    interval: int
+
+    def __init__(self, interval: int = 1) -> None:
+        """Initialize an observer whose per-day hooks are called on every interval-th day.
+
+        Preconditions:
+            - interval >= 1
+        """
+        self.interval = interval
+
+    def hooks(self) -> list[str]:
+        """Return the names of the hooks overridden by this observer.
+
+        >>> ConsoleObserver().hooks()
+        ['on_state_day', 'on_state_cleared']
+        """
+        return [hook for hook in HOOKS if getattr(type(self), hook) is not getattr(Observer, hook)]
+
+    def on_state_day(self, zones: InfectedZones, state: State) -> None:
+        """Called before the given running state simulates the current day (zones.day)."""
+
+    def on_day_end(self, zones: InfectedZones, day: int) -> None:
+        """Called after every running state simulated the given day and tried to infect other states."""
+
+    def on_state_infected(self, zones: InfectedZones, state: State) -> None:
+        """Called every time the given state gets infected, including the first state of the simulation."""
+
+    def on_edge_added(self, zones: InfectedZones, state1_name: str, state2_name: str) -> None:
+        """Called when an edge is added between the states named state1_name and state2_name,
+        that is, when state1_name infects state2_name.
+        """
+
+    def on_state_cleared(self, zones: InfectedZones, state: State) -> None:
+        """Called when the infection process of the given state finishes, because it has no infective people."""
+
+
+class ConsoleObserver(Observer):
+    """An observer that prints the numbers of every running state on every day, and the final numbers
+    of every state whose infection process finishes, in the same format as the original simulation.
+    """
+
+    def on_state_day(self, zones: InfectedZones, state: State) -> None:
+        """Print the numbers of the given state before it simulates a day."""
+        print(f"--- {state.name, len(state.sus), len(state.inf), len(state.rem)} ----")
+
+    def on_state_cleared(self, zones: InfectedZones, state: State) -> None:
+        """Print the final numbers of the given state."""
+        print(f'All Removed: {state.name, len(state.sus), len(state.inf), len(state.rem)}')
+
+
+class FlushObserver(Observer):
+    """An observer that flushes an AgentTable stored in memory-mapped files at the end of every interval-th day,
+    so the changes are written to the files and the memory used by the table does not grow with the population.
+
+    Instance Attributes
+    - table: the flushed table
+    """
+    table: AgentTable
+
+    def __init__(self, table: AgentTable, interval: int = 1) -> None:
+        """Initialize an observer flushing the given table at the end of every interval-th day.
+
+        Preconditions:
+            - interval >= 1
+        """
+        super().__init__(interval)
+        self.table = table
+
+    def on_day_end(self, zones: InfectedZones, day: int) -> None:
+        """Flush the table."""
+        self.table.flush()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['graph', 'sir_model'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'W0613']
+    })
@@ -3,8 +3,9 @@
 Instructions
 ===============================
 
-This python module only contains the function for visual presentation.
-This function is automatically triggered in main() function.
+This python module only contains the functions for visual presentation.
+plot_diagram is automatically triggered in main() function, and it can also save the diagram
+as an HTML page or an image instead of opening a browser, for batch jobs without a display.
 
 Copyright and Usage Information
 ===============================
@@ -17,53 +18,78 @@ expressly prohibited. :)
 This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
 """
 
+from __future__ import annotations
+import csv
+from typing import Optional, Sequence, Union
+
 import plotly.graph_objects as go
-import pandas as pd
 
+# An edge row, in the format of the rows of the file saved by simulations.graph_to_csv:
+# (start_lat, start_lon, end_lat, end_lon, state1, state2)
+EdgeRow = Sequence[Union[float, str]]
 
-def plot_diagram(states_file: str, edges_file: str) -> None:
-    """Plots a geographical diagram of the United States showing states and their connections.
 
-    Args:
-        states_file: A string representing the file path of the CSV file containing information about the states.
-            The CSV file should contain columns for State, Latitude, and Longitude.
-        edges_file: A string representing the file path of the CSV file containing information about the edges
-            connecting the states. The CSV file should contain columns for start_state, start_lat, start_lon,
-            end_state, end_lat, and end_lon.
+def read_edges(edges_file: str) -> list[tuple[float, float, float, float, str, str]]:
+    """Return the edge rows of the given CSV file saved by simulations.graph_to_csv.
 
     Preconditions:
-        - The 'states_file' and 'edges_file' paths must point to valid CSV files.
-        - The CSV file specified by 'states_file' must contain columns for 'State', 'Latitude', and 'Longitude'.
-        - The CSV file specified by 'edges_file' must contain columns for 'start_state', 'start_lat', 'start_lon',
-          'end_state', 'end_lat', and 'end_lon'.
+        - edges_file is a valid path to a CSV file with the columns start_lat, start_lon, end_lat, end_lon,
+          state1 and state2
     """
-    df_states = pd.read_csv(states_file)
-    df_states.head()
+    with open(edges_file) as file:
+        return [(float(row['start_lat']), float(row['start_lon']), float(row['end_lat']), float(row['end_lon']),
+                 row['state1'], row['state2']) for row in csv.DictReader(file)]
 
-    df_state_paths = pd.read_csv(edges_file)
-    df_state_paths.head()
 
-    fig = go.Figure()
+def build_figure(states_file: str, edges: Union[str, Sequence[EdgeRow]]) -> go.Figure:
+    """Return the geographical diagram of the United States showing states and their connections.
+    All the edges are one trace, whose lines are separated by None, and the states are one marker trace,
+    so the time to build and draw the figure does not grow with a trace per edge.
 
-    for i in range(len(df_state_paths)):
-        fig.add_trace(
-            go.Scattergeo(
-                locationmode='USA-states',
-                text=df_state_paths['state2'] + ' - ' + df_state_paths['state1'],
-                lon=[df_state_paths['start_lon'][i], df_state_paths['end_lon'][i]],
-                lat=[df_state_paths['start_lat'][i], df_state_paths['end_lat'][i]],
-                mode='lines+markers',
-                marker=dict(size=5, color='red'),
-                line=dict(width=1, color='red'),
-            )
+    edges is either the path of a CSV file saved by simulations.graph_to_csv, or its rows in memory
+    (see simulations.get_edge_rows).
+
+    Preconditions:
+        - states_file is a valid path to a CSV file with the columns State, Latitude and Longitude
+        - edges is a valid path to a CSV file as described above, or a sequence of edge rows
+
+    >>> fig = build_figure('data/states_small.csv', [(1.0, 2.0, 3.0, 4.0, 'Alaska', 'Arkansas')])
+    >>> len(fig.data)
+    2
+    >>> fig.data[0].lon, fig.data[0].text
+    ((2.0, 4.0, None), ('Arkansas - Alaska', 'Arkansas - Alaska', None))
+    """
+    if isinstance(edges, str):
+        edges = read_edges(edges)
+    with open(states_file) as file:
+        states = list(csv.DictReader(file))
+
+    lon, lat, text = [], [], []
+    for start_lat, start_lon, end_lat, end_lon, state1, state2 in edges:
+        label = f'{state2} - {state1}'
+        lon.extend([start_lon, end_lon, None])
+        lat.extend([start_lat, end_lat, None])
+        text.extend([label, label, None])
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scattergeo(
+            locationmode='USA-states',
+            text=text,
+            lon=lon,
+            lat=lat,
+            mode='lines+markers',
+            marker=dict(size=5, color='red'),
+            line=dict(width=1, color='red'),
         )
+    )
 
     fig.add_trace(go.Scattergeo(
         locationmode='USA-states',
-        lon=df_states['Longitude'],
-        lat=df_states['Latitude'],
+        lon=[float(state['Longitude']) for state in states],
+        lat=[float(state['Latitude']) for state in states],
         hoverinfo='text',
-        text=df_states['State'],
+        text=[state['State'] for state in states],
         mode='markers',
         marker=dict(
             size=5,
@@ -85,6 +111,46 @@ def plot_diagram(states_file: str, edges_file: str) -> None:
             countrycolor='rgb(204, 204, 204)',
         )
     )
+    return fig
+
 
-    # Show the figure
-    fig.show()
+def plot_diagram(states_file: str, edges: Union[str, Sequence[EdgeRow]], output: Optional[str] = None) -> None:
+    """Plots a geographical diagram of the United States showing states and their connections.
+
+    Args:
+        states_file: A string representing the file path of the CSV file containing information about the states.
+            The CSV file should contain columns for State, Latitude, and Longitude.
+        edges: Either a string representing the file path of the CSV file containing information about the edges
+            connecting the states, with the columns start_lat, start_lon, end_lat, end_lon, state1 and state2,
+            or the rows of such a file in memory (see simulations.get_edge_rows).
+        output: If None, the diagram is opened in the browser. Otherwise, the diagram is saved to this path
+            without opening a browser: as a standalone HTML page (which loads plotly.js from its CDN) if the path
+            ends with '.html', and as a static image of the format given by its extension otherwise
+            (this needs the kaleido package).
+
+    Preconditions:
+        - The 'states_file' path must point to a valid CSV file with columns for 'State', 'Latitude', and
+          'Longitude'.
+        - If 'edges' is a string, it must point to a valid CSV file with columns for 'start_lat', 'start_lon',
+          'end_lat', 'end_lon', 'state1' and 'state2'.
+    """
+    fig = build_figure(states_file, edges)
+    if output is None:
+        # Show the figure
+        fig.show()
+    elif output.endswith('.html'):
+        fig.write_html(output, include_plotlyjs='cdn')
+    else:
+        fig.write_image(output)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['csv', 'plotly.graph_objects'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'R0914']
+    })
@@ -0,0 +1,246 @@
+"""CSC111 Winter 2023 Course Project: Profiling
+
+Instructions
+===============================
+
+This Python module contains the Profiler class, which measures how long each phase of the simulation takes.
+When an InfectedZones is created with a Profiler, the groups of people of every state are wrapped
+while the simulation runs, so that every call made by State.infection_process is timed, and
+every state's attempt to infect another state is timed as well. The phases are:
+
+- sample_susceptible: choosing the newly infected people from the susceptible group
+- add_infective: adding the newly infected people to the infective group
+- remove_recoverable: finding and removing the recovered people from the infective group
+- add_removed: adding the recovered people to the removal group
+- increment_day: advancing the infected days of the infective group
+- infect_next_state: choosing the next state to infect and infecting it
+- csv_export: saving the connections with simulations.graph_to_csv (timed by main)
+
+Nothing is wrapped or timed when no Profiler is given, so the simulation does not slow down.
+The report of a Profiler shows the number of calls, the total time and the percentiles of the time of a call
+of every phase, and the total time of every phase in every state.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import contextlib
+import time
+from array import array
+from collections.abc import Iterator
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from graph import State
+
+# The phases of the simulation, in the order they are reported
+PHASES = ('sample_susceptible', 'add_infective', 'remove_recoverable', 'add_removed', 'increment_day',
+          'infect_next_state', 'csv_export')
+# The percentiles of the time of a call reported for every phase
+PERCENTILES = (50, 90, 99)
+
+# The phase of each method called by State.infection_process, for each group of people
+SUSCEPTIBLE_PHASES = {'remove_by_number': 'sample_susceptible'}
+INFECTIVE_PHASES = {'add_multiple': 'add_infective', 'num_recoverable': 'remove_recoverable',
+                    'remove_by_number': 'remove_recoverable', 'increment_day': 'increment_day'}
+REMOVAL_PHASES = {'add_multiple': 'add_removed'}
+
+
+class Profiler:
+    """The time taken by each phase of the simulation in each state.
+
+    Private Instance Attributes
+    - _times: A dictionary mapping (state name, phase) to the time of every call of the phase
+      for the state, in nanoseconds. The state name is None for the phases that do not belong to a state.
+    - _depth: The number of phases timed with the time method that are running.
+
+    >>> profiler = Profiler()
+    >>> profiler.add('state1', 'increment_day', 2000)
+    >>> profiler.add('state1', 'increment_day', 4000)
+    >>> with profiler.time('csv_export'):
+    ...     pass
+    >>> profiler.calls('increment_day')
+    2
+    >>> profiler.total('increment_day')
+    6e-06
+    """
+    _times: dict[tuple[Optional[str], str], array]
+    _depth: int
+
+    def __init__(self) -> None:
+        """Initialize a profiler with no recorded time."""
+        self._times = {}
+        self._depth = 0
+
+    def add(self, state_name: Optional[str], phase: str, nanoseconds: int) -> None:
+        """Record one call of the given phase for the state with the given name, which took the given time.
+
+        Preconditions:
+            - phase in PHASES
+        """
+        key = (state_name, phase)
+        if key not in self._times:
+            self._times[key] = array('q')
+        self._times[key].append(nanoseconds)
+
+    @contextlib.contextmanager
+    def time(self, phase: str, state_name: Optional[str] = None) -> Iterator[None]:
+        """Record the time taken by the body of a with statement as one call of the given phase
+        for the state with the given name. The calls of the wrapped groups in the body are part of this phase,
+        and they are not recorded separately, so no time is counted twice.
+
+        Preconditions:
+            - phase in PHASES
+        """
+        start = time.perf_counter_ns()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.add(state_name, phase, time.perf_counter_ns() - start)
+
+    def in_phase(self) -> bool:
+        """Return whether a phase timed with the time method is running."""
+        return self._depth > 0
+
+    def wrap(self, state: State) -> None:
+        """Replace the groups of people of the given state with ones whose calls are recorded by this profiler.
+
+        Preconditions:
+            - the groups of people of state are not wrapped
+        """
+        state.sus = TimedGroup(state.sus, self, state.name, SUSCEPTIBLE_PHASES)
+        state.inf = TimedGroup(state.inf, self, state.name, INFECTIVE_PHASES)
+        state.rem = TimedGroup(state.rem, self, state.name, REMOVAL_PHASES)
+
+    def unwrap(self, state: State) -> None:
+        """Restore the groups of people of the given state replaced by wrap.
+
+        Preconditions:
+            - the groups of people of state are wrapped by wrap
+        """
+        state.sus = state.sus.group
+        state.inf = state.inf.group
+        state.rem = state.rem.group
+
+    def _phase_times(self, phase: str) -> np.ndarray:
+        """Return the time of every call of the given phase in all states, in nanoseconds."""
+        parts = [np.frombuffer(times, dtype=np.int64) for (_, p), times in self._times.items() if p == phase]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def calls(self, phase: str) -> int:
+        """Return the number of calls of the given phase in all states."""
+        return len(self._phase_times(phase))
+
+    def total(self, phase: str) -> float:
+        """Return the total time of the given phase in all states, in seconds."""
+        return int(self._phase_times(phase).sum()) / 1e9
+
+    def report(self) -> str:
+        """Return a table of the number of calls, the total time and the percentiles of the time of a call
+        of every phase, followed by a table of the total time of every phase in every state.
+
+        >>> profiler = Profiler()
+        >>> profiler.add('state1', 'increment_day', 2000)
+        >>> print(profiler.report())  # doctest: +NORMALIZE_WHITESPACE
+        Phase                  Calls   Total (s)   Share     p50 (us)     p90 (us)     p99 (us)
+        increment_day              1    0.000002  100.0%        2.000        2.000        2.000
+        <BLANKLINE>
+        Total time by state (s)
+        State                increment_day
+        state1                    0.000002
+        """
+        phases = [phase for phase in PHASES if self.calls(phase) > 0]
+        overall = sum(self.total(phase) for phase in phases)
+        percentile_titles = ''.join(f'{f"p{p} (us)":>13}' for p in PERCENTILES)
+        lines = [f'{"Phase":<20}{"Calls":>7}{"Total (s)":>12}{"Share":>8}{percentile_titles}']
+        for phase in phases:
+            times = self._phase_times(phase)
+            share = self.total(phase) / overall if overall > 0 else 0.0
+            percentiles = ''.join(f'{value / 1e3:>13.3f}' for value in np.percentile(times, PERCENTILES))
+            lines.append(f'{phase:<20}{len(times):>7}{self.total(phase):>12.6f}{share:>8.1%}{percentiles}')
+
+        state_names = sorted({name for name, _ in self._times if name is not None})
+        state_phases = [phase for phase in phases if any((name, phase) in self._times for name in state_names)]
+        if state_names:
+            lines.extend(['', 'Total time by state (s)',
+                          f'{"State":<20}' + ''.join(f'{phase:>20}' for phase in state_phases)])
+        for name in state_names:
+            totals = [int(np.frombuffer(self._times[(name, phase)], dtype=np.int64).sum()) / 1e9
+                      if (name, phase) in self._times else 0.0 for phase in state_phases]
+            lines.append(f'{name:<20}' + ''.join(f'{total:>20.6f}' for total in totals))
+        return '\n'.join(lines)
+
+
+class TimedGroup:
+    """A group of people of a state (Susceptible, Infective or Removal, or their count-based counterparts),
+    whose calls of some methods are recorded by a profiler. Everything else is passed to the group.
+
+    Instance Attributes
+    - group: the wrapped group of people
+
+    Private Instance Attributes
+    - _profiler: The profiler recording the calls.
+    - _state_name: The name of the state the group belongs to.
+    - _phases: A dictionary mapping the name of each timed method to its phase.
+    """
+    group: Any
+    _profiler: Profiler
+    _state_name: str
+    _phases: dict[str, str]
+
+    def __init__(self, group: Any, profiler: Profiler, state_name: str, phases: dict[str, str]) -> None:
+        """Initialize a timed wrapper of the given group of the state with the given name."""
+        self.group = group
+        self._profiler = profiler
+        self._state_name = state_name
+        self._phases = phases
+
+    def __len__(self) -> int:
+        """Return the number of people in the group."""
+        return len(self.group)
+
+    def __repr__(self) -> str:
+        """Return the representation of the group."""
+        return repr(self.group)
+
+    def __getattr__(self, name: str) -> Any:
+        """Return the attribute of the group with the given name, timed if it is a timed method."""
+        attribute = getattr(self.group, name)
+        if name not in self._phases:
+            return attribute
+        return self._timed(attribute, self._phases[name])
+
+    def _timed(self, method: Callable, phase: str) -> Callable:
+        """Return a function that calls the given method and records its time as one call of the given phase."""
+        def timed_method(*args: Any) -> Any:
+            """Call the method with the given arguments and record its time."""
+            if self._profiler.in_phase():
+                return method(*args)
+            start = time.perf_counter_ns()
+            result = method(*args)
+            self._profiler.add(self._state_name, phase, time.perf_counter_ns() - start)
+            return result
+        return timed_method
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['contextlib', 'time', 'array', 'collections.abc', 'numpy', 'graph'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998']
+    })
@@ -0,0 +1,170 @@
+"""CSC111 Winter 2023 Course Project: Recorder
+
+Instructions
+===============================
+
+This Python module contains the Recorder class, which records the course of a simulation.
+On every day, InfectedZones and VectorizedZones append one row for every running state to the recorder,
+with the numbers of susceptible, infective and removed people of the state after that day,
+and the numbers of people who were infected and removed on that day.
+Every time a state infects another state, a spread event is recorded as well.
+
+The rows are stored column by column in growable typed arrays, so appending a row does not create
+any objects, and at the end of the simulation the columns can be saved as a compressed NPZ file
+(or as a Parquet file with pandas) for plotting the curves of every state.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+from array import array
+
+import numpy as np
+
+# The columns of the rows recorded for every state on every day
+DAY_COLUMNS = ('day', 'state', 'sus', 'inf', 'rem', 'new_infected', 'new_removed')
+# The columns of the spread events
+SPREAD_COLUMNS = ('spread_day', 'source', 'target')
+
+
+class Recorder:
+    """The per-day numbers of every state and the spread events of a simulation, stored by column.
+
+    Instance Attributes
+    - state_names: the names of the states, the state column stores the index of a state in this list
+    - fractional: whether the numbers of people are stored as floats, as needed for VectorizedZones
+      in the 'mean_field' mode, instead of integers
+
+    Private Instance Attributes
+    - _columns: A dictionary mapping the name of each column in DAY_COLUMNS and SPREAD_COLUMNS to its values.
+
+    Representation Invariants:
+    - all(len(self._columns[c]) == len(self._columns['day']) for c in DAY_COLUMNS)
+    - all(len(self._columns[c]) == len(self._columns['spread_day']) for c in SPREAD_COLUMNS)
+
+    >>> recorder = Recorder(['state1', 'state2'])
+    >>> recorder.record_day(0, 0, 970, 90, 0, 30, 0)
+    >>> recorder.record_day(1, 0, 927, 133, 0, 43, 0)
+    >>> recorder.record_spread(1, 0, 1)
+    >>> len(recorder)
+    2
+    >>> recorder.columns()['inf'].tolist()
+    [90, 133]
+    """
+    state_names: list[str]
+    fractional: bool
+    _columns: dict[str, array]
+
+    def __init__(self, state_names: list[str], fractional: bool = False) -> None:
+        """Initialize an empty recorder for the states with the given names."""
+        self.state_names = list(state_names)
+        self.fractional = fractional
+        number_type = 'd' if fractional else 'q'
+        self._columns = {'day': array('q'), 'state': array('q')}
+        for column in DAY_COLUMNS[2:]:
+            self._columns[column] = array(number_type)
+        for column in SPREAD_COLUMNS:
+            self._columns[column] = array('q')
+
+    def __len__(self) -> int:
+        """Return the number of rows recorded for the states."""
+        return len(self._columns['day'])
+
+    def record_day(self, day: int, state: int, sus: float, inf: float, rem: float,
+                   new_infected: float, new_removed: float) -> None:
+        """Record the numbers of the state with the given index after the given day.
+
+        Preconditions:
+            - 0 <= state < len(self.state_names)
+        """
+        columns = self._columns
+        columns['day'].append(day)
+        columns['state'].append(state)
+        columns['sus'].append(sus)
+        columns['inf'].append(inf)
+        columns['rem'].append(rem)
+        columns['new_infected'].append(new_infected)
+        columns['new_removed'].append(new_removed)
+
+    def record_days(self, day: int, states: np.ndarray, sus: np.ndarray, inf: np.ndarray, rem: np.ndarray,
+                    new_infected: np.ndarray, new_removed: np.ndarray) -> None:
+        """Record the numbers of all the states with the given indices after the given day at once.
+
+        Preconditions:
+            - len(states) == len(sus) == len(inf) == len(rem) == len(new_infected) == len(new_removed)
+
+        >>> recorder = Recorder(['state1', 'state2'])
+        >>> numbers = np.array([5, 6])
+        >>> recorder.record_days(3, np.array([0, 1]), numbers, numbers, numbers, numbers, numbers)
+        >>> recorder.columns()['day'].tolist()
+        [3, 3]
+        """
+        self._columns['day'].extend([day] * len(states))
+        for column, values in (('state', states), ('sus', sus), ('inf', inf), ('rem', rem),
+                               ('new_infected', new_infected), ('new_removed', new_removed)):
+            target = self._columns[column]
+            target.frombytes(np.asarray(values, dtype=np.dtype(target.typecode)).tobytes())
+
+    def record_spread(self, day: int, source: int, target: int) -> None:
+        """Record that the state with index source infected the state with index target on the given day."""
+        self._columns['spread_day'].append(day)
+        self._columns['source'].append(source)
+        self._columns['target'].append(target)
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """Return a dictionary mapping the name of every column to a NumPy array of its values.
+        The arrays share their memory with the recorder until more rows are recorded.
+        """
+        return {name: np.frombuffer(values, dtype=np.dtype(values.typecode)) if len(values) > 0
+                else np.array([], dtype=np.dtype(values.typecode))
+                for name, values in self._columns.items()}
+
+    def save(self, path: str) -> None:
+        """Save the columns and the state names to the given path.
+        A path ending with '.parquet' is saved with pandas as a Parquet file of the per-day rows, with the state
+        names instead of their indices (this needs a Parquet engine such as pyarrow),
+        and any other path is saved as a compressed NPZ file, which can be read with load_recording.
+        """
+        columns = self.columns()
+        if path.endswith('.parquet'):
+            import pandas as pd
+            rows = pd.DataFrame({name: columns[name] for name in DAY_COLUMNS})
+            rows['state'] = pd.Categorical.from_codes(rows['state'], categories=self.state_names)
+            rows.to_parquet(path)
+        else:
+            np.savez_compressed(path, state_names=np.array(self.state_names), **columns)
+
+
+def load_recording(path: str) -> dict[str, np.ndarray]:
+    """Return the columns and the state names saved in the given NPZ file by Recorder.save.
+
+    >>> import os, tempfile
+    >>> recorder = Recorder(['state1'])
+    >>> recorder.record_day(0, 0, 970, 90, 0, 30, 0)
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     recorder.save(os.path.join(folder, 'run.npz'))
+    ...     recording = load_recording(os.path.join(folder, 'run.npz'))
+    >>> recording['state_names'].tolist(), recording['new_infected'].tolist()
+    (['state1'], [30])
+    """
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['array', 'numpy', 'pandas'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'C0415']
+    })
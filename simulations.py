@@ -23,47 +23,136 @@ This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
 from __future__ import annotations
 
 import csv
-from typing import Optional
+import os
+from typing import Optional, Union
 
 from graph import InfectedZones, State
-from sir_model import Person, Susceptible
+from sir_model import Susceptible, SusceptibleCount, InfectiveCount, RemovalCount, AgentTable, SusceptibleTable, \
+    InfectiveTable, RemovalTable
 
 RATE_OF_REMOVAL = 0.4               # Rate of removing people from the infective group to removed
 RATE_OF_CONTACT = 0.0005           # Rate of removing people from the susceptible group to the infective
 
+# The available models for populating states:
+# 'agent' represents every person with a Person object,
+# 'count' only keeps the number of people in each group, which is much faster for large populations,
+# 'table' tracks every person by id in an AgentTable of arrays, which takes a few bytes per person.
+ENGINES = ('agent', 'count', 'table')
 
-def populate_states(csv_file: str) -> tuple[dict[str, State], list[str]]:
-    """Initialize State objects and populate States with Person objects.
+
+def read_dataset(csv_file: str) -> list[list[str]]:
+    """Return the rows of the dataset in the given csv file, without the header row,
+    which populate_states can populate states from without reading the file again.
+
+    Preconditions:
+        - csv_file is a valid path to the file
+
+    >>> read_dataset('data/states_small.csv')[0]
+    ['Alaska', '64.0685', '-152.2782', '738']
+    """
+    with open(csv_file) as file:
+        reader = csv.reader(file)
+        next(reader)
+        return list(reader)
+
+
+def populate_states(csv_file: Union[str, list[list[str]]], engine: str = 'agent',
+                    store: Optional[str] = None) -> tuple[dict[str, State], list[str]]:
+    """Initialize State objects and populate States with people.
     Return a tuple with the first element being the dictionary with state_names to State objects,
     and the second element being the list of state_names that comes in handy to randomly select
     states.
 
+    If engine is 'count', the states are populated with the count-based SusceptibleCount, InfectiveCount and
+    RemovalCount instead, so no Person object is created.
+    If engine is 'table', the people of all states are stored in one AgentTable, and the states are populated
+    with SusceptibleTable, InfectiveTable and RemovalTable on top of it. If store is also given, the AgentTable
+    is stored in memory-mapped files in the folder with this path instead of in memory, and the range of ids
+    of every state is saved in states.csv in the same folder, so the folder describes every person after
+    the simulation (see sir_model.load_store).
+    Raise a ValueError if engine is not in ENGINES.
+
+    csv_file can also be the rows of the dataset returned by read_dataset.
+
     Preconditions:
-        - csv_file is a valid path to the file
+        - csv_file is a valid path to the file, or the rows returned by read_dataset
+
+    >>> states, keys = populate_states('data/states_small.csv', engine='count')
+    >>> states[keys[0]]
+    Alaska: S=738, I=0, R=0
+    >>> states, keys = populate_states('data/states_small.csv', engine='table')
+    >>> states[keys[2]]
+    Arkansas: S=1000, I=0, R=0
     """
+    if engine not in ENGINES:
+        raise ValueError
     states = {}
     keys = []
-    with open(csv_file) as file:
-        reader = csv.reader(file)
-        next(reader)
-        person_id = 0
-        for line in reader:
-            lst = []
-            for i in range(person_id, person_id + int(line[3])):
-                lst.append(Person(i))
+    lines = read_dataset(csv_file) if isinstance(csv_file, str) else csv_file
+    table = AgentTable(sum(int(line[3]) for line in lines), store) if engine == 'table' else None
+    if table is not None and store is not None:
+        with open(os.path.join(store, 'states.csv'), 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['State', 'Start', 'Stop'])
+            start = 0
+            for line in lines:
+                writer.writerow([line[0], start, start + int(line[3])])
+                start += int(line[3])
+    person_id = 0
+    for line in lines:
+        keys.append(line[0])
+        location = (float(line[1]), float(line[2]))
+        if engine == 'count':
+            states[line[0]] = State(name=line[0],
+                                    sus=SusceptibleCount(int(line[3])),
+                                    a=RATE_OF_REMOVAL,
+                                    r=RATE_OF_CONTACT,
+                                    location=location,
+                                    inf=InfectiveCount(),
+                                    rem=RemovalCount())
+        elif engine == 'table':
+            ids = range(person_id, person_id + int(line[3]))
             person_id += int(line[3])
-            keys.append(line[0])
             states[line[0]] = State(name=line[0],
-                                    sus=Susceptible(lst),
+                                    sus=SusceptibleTable(table, ids),
                                     a=RATE_OF_REMOVAL,
                                     r=RATE_OF_CONTACT,
-                                    location=(float(line[1]), float(line[2])))
+                                    location=location,
+                                    inf=InfectiveTable(table, ids),
+                                    rem=RemovalTable(table, ids))
+        else:
+            # Each state gets a contiguous range of ids, and a Person is only created
+            # when the person leaves the susceptible group.
+            ids = range(person_id, person_id + int(line[3]))
+            person_id += int(line[3])
+            states[line[0]] = State(name=line[0],
+                                    sus=Susceptible(ids),
+                                    a=RATE_OF_REMOVAL,
+                                    r=RATE_OF_CONTACT,
+                                    location=location)
     return (states, keys)
 
 
-def graph_to_csv(infected_zones: InfectedZones) -> str:
+def get_edge_rows(infected_zones: InfectedZones) -> list[list]:
+    """Return the rows of the connected states of the given InfectedZones, each row represent a pair of
+    connected states, with their location and state names, in the order of the fields of graph_to_csv.
+    The rows are in the order the states were connected, and state1 is the state that infected state2.
+    Preconditions:
+        - infected_zones is a valid object
+    """
+    infected_states = infected_zones.get_infected_states()
+    rows = []
+    for _, state1, state2 in infected_zones.edges.rows():
+        start_lat, start_lon = infected_states[state1].location
+        end_lat, end_lon = infected_states[state2].location
+        rows.append([start_lat, start_lon, end_lat, end_lon, state1, state2])
+    return rows
+
+
+def graph_to_csv(infected_zones: InfectedZones, rows: Optional[list[list]] = None) -> str:
     """Create a new csv file, from the given InfectedZones, each row represent a pair of connected states,
     with their location and state names. Then save the csv file under project file.
+    If rows is given, it is used as the rows returned by get_edge_rows for infected_zones.
     Return the path of the dataset.
     Preconditions:
         - infected_zones is a valid object
@@ -72,16 +161,8 @@ def graph_to_csv(infected_zones: InfectedZones) -> str:
     fields = ['start_lat', 'start_lon', 'end_lat', 'end_lon', 'state1', 'state2']
 
     # data rows of csv file
-    state1_state2 = infected_zones.get_state_connections()
-    infected_states = infected_zones.get_infected_states()
-    rows = []
-    for row in state1_state2:
-        state_name1, state_name2 = list(row)[0], list(row)[1]
-        start_lat, start_lon = infected_states[state_name1].location
-        end_lat, end_lon = infected_states[state_name2].location
-        state1 = state_name1
-        state2 = state_name2
-        rows.append([start_lat, start_lon, end_lat, end_lon, state1, state2])
+    if rows is None:
+        rows = get_edge_rows(infected_zones)
 
     # name of csv file
     filename = "edges.csv"
@@ -99,6 +180,23 @@ def graph_to_csv(infected_zones: InfectedZones) -> str:
     return filename
 
 
+def apply_policies(infected_zones: InfectedZones, input_dict: dict[str, list]) -> None:
+    """Apply the given policies to the states in infected_zones.
+    input_dict maps state names to lists containing the isolation index, maskwearing index,
+    vaccination index, and lockdown status (True/False), in the same format as returned by get_user_input.
+
+    Preconditions:
+        - all(key in the states of infected_zones for key in input_dict)
+    """
+    for key in input_dict:
+        infected_zones.change_a_and_r(state_name=key,
+                                      isolation_degree=input_dict[key][0],
+                                      maskwearing_degree=input_dict[key][1],
+                                      vaccination_degree=input_dict[key][2])
+        if input_dict[key][3]:
+            infected_zones.movement_prohibited(state_name=key)
+
+
 def get_user_input(keys) -> Optional[dict[str, list]]:
     """Takes in a list of keys and prompts the user to enter values for each key.
 
@@ -146,6 +244,6 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['random'],
+        'extra-imports': ['os', 'random'],
         'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'R0914']
     })
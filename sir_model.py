@@ -5,9 +5,29 @@ Instructions
 
 This Python module contains the implementation of SIR Model classes,
 which are Person, Susceptible, Infective, and Removal.
+Each of the three groups stores its people in a SamplingPool, which supports removing random people
+in constant time per person. Susceptible can also be created from a range of ids with an IdRangePool,
+where a Person object is only created once the person leaves the group.
+Infective further groups its people by the day they were infected, so advancing a day and finding recoverable people
+do not need to go through every infected person.
 The SIR model is a mathematical model used to understand the spread of infectious diseases in a population.
 With these classes, we are able to simulate the COVID-19 infection and recovery process.
 
+SusceptibleCount, InfectiveCount and RemovalCount are the count-based counterparts of the three groups.
+They only keep the number of people in each group (and, for the infective group, how many days they
+have been infected), so one simulated day costs the same no matter how large the population is.
+
+SusceptibleTable, InfectiveTable and RemovalTable are the agent table counterparts of the three groups.
+Every person is still tracked by id, but the people of all states are stored in one AgentTable of NumPy arrays
+indexed by id instead of Person objects, and the groups move arrays of ids, so a person takes a few bytes
+and a simulated day is a few array operations. The AgentTable can also be stored in memory-mapped files,
+for populations that do not fit in memory.
+
+Every group (and the AgentTable) can return its content as a dictionary of NumPy arrays with snapshot,
+and be created again from it with from_snapshot, which is how checkpoint.py saves a simulation
+without pickling Person objects. The people keep their order in every group, so a simulation continued
+from a snapshot makes the same random choices as the original one.
+
 Copyright and Usage Information
 ===============================
 
@@ -19,9 +39,28 @@ expressly prohibited. :)
 This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
 """
 from __future__ import annotations
-from typing import Optional
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Optional, Union
+import json
+import math
+import mmap
+import os
 import random
 
+import numpy as np
+
+# A person is possible to recover only if the person has been infected for more than this number of days.
+INFECTIOUS_PERIOD = 14
+# The compartment codes of the people in an AgentTable
+SUSCEPTIBLE, INFECTIVE, REMOVED = 0, 1, 2
+# The largest number of people chosen one by one from an AgentTable group, larger samples are chosen at once
+SMALL_SAMPLE = 32
+# The largest number of people an AgentTable group chooses or fills at once, which bounds the temporary memory
+SAMPLE_CHUNK = 1 << 20
+# The columns of an AgentTable, and their types
+STORE_COLUMNS = (('compartment', np.int8), ('infected_day', np.int32), ('order', np.int32))
+
 
 class Person:
     """Person class that represents a person in the population
@@ -82,6 +121,355 @@ class Person:
         self.infected_time += 1
 
 
+class SamplingPool(Mapping):
+    """A pool of people mapping each person's id to the person, that supports removing a random person
+    in O(1) time.
+
+    The people are stored in a list, together with a mapping from each person's id to the person's slot
+    in the list. A person is removed by moving the last person of the list into the removed person's slot,
+    so the list never has to be shifted or rebuilt.
+
+    Private Instance Attributes
+    - _items:
+        A list of all people in the pool, in no particular order.
+    - _slots:
+        A mapping from each person's id to the index of the person in _items.
+
+    Representation Invariants:
+    - len(self._items) == len(self._slots)
+    - all(self._slots[p.id] == i for i, p in enumerate(self._items))
+    """
+    _items: list[Person]
+    _slots: dict[int, int]
+
+    def __init__(self, people: Iterable[Person] = ()) -> None:
+        """Initialize this pool with the given people.
+
+        Preconditions:
+            - all ids of people are distinct
+        """
+        self._items = []
+        self._slots = {}
+        self.extend(people)
+
+    def __getitem__(self, identifier: int) -> Person:
+        """Return the person with the given id."""
+        return self._items[self._slots[identifier]]
+
+    def __iter__(self) -> Iterator[int]:
+        """Return an iterator over the ids of the people in this pool."""
+        return (p.id for p in self._items)
+
+    def __len__(self) -> int:
+        """Return the number of people in this pool."""
+        return len(self._items)
+
+    def __contains__(self, identifier: object) -> bool:
+        """Return whether the person with the given id is in this pool."""
+        return identifier in self._slots
+
+    def __repr__(self) -> str:
+        """Return a string representing this pool, in the same form as a dict.
+
+        >>> SamplingPool([Person(1)])
+        {1: id=1, infected_time=None}
+        """
+        return repr({p.id: p for p in self._items})
+
+    def values(self) -> list[Person]:
+        """Return a list of all people in this pool."""
+        return list(self._items)
+
+    def ids(self) -> np.ndarray:
+        """Return the ids of the people in this pool, in the order of their slots.
+
+        >>> SamplingPool([Person(3), Person(1)]).ids().tolist()
+        [3, 1]
+        """
+        return np.fromiter((p.id for p in self._items), dtype=np.int64, count=len(self._items))
+
+    def add(self, person: Person) -> None:
+        """Add the given person to this pool.
+
+        Preconditions:
+            - person.id not in self
+        """
+        self._slots[person.id] = len(self._items)
+        self._items.append(person)
+
+    def extend(self, people: Iterable[Person]) -> None:
+        """Add all the given people to this pool.
+
+        Preconditions:
+            - all(p.id not in self for p in people)
+        """
+        for p in people:
+            self.add(p)
+
+    def pop(self, identifier: int) -> Person:
+        """Remove and return the person with the given id.
+
+        Preconditions:
+            - identifier in self
+
+        >>> pool = SamplingPool([Person(1), Person(2), Person(3)])
+        >>> pool.pop(1)
+        id=1, infected_time=None
+        >>> sorted(pool)
+        [2, 3]
+        """
+        return self._pop_slot(self._slots[identifier])
+
+    def pop_random(self) -> Person:
+        """Remove and return a random person in this pool.
+
+        Preconditions:
+            - len(self) > 0
+        """
+        return self._pop_slot(random.randrange(len(self._items)))
+
+    def sample_and_remove(self, k: int) -> list[Person]:
+        """Remove and return k distinct random people in this pool.
+        If k >= len(self), all people in this pool are removed.
+
+        Preconditions:
+            - k >= 0
+
+        >>> pool = SamplingPool([Person(i) for i in range(5)])
+        >>> len({p.id for p in pool.sample_and_remove(3)})
+        3
+        >>> len(pool)
+        2
+        """
+        if k >= len(self._items):
+            return self.clear()
+        return [self._pop_slot(random.randrange(len(self._items))) for _ in range(k)]
+
+    def clear(self) -> list[Person]:
+        """Remove and return all people in this pool."""
+        people = self._items
+        self._items = []
+        self._slots = {}
+        return people
+
+    def _pop_slot(self, slot: int) -> Person:
+        """Remove and return the person at the given slot, by moving the last person into the slot."""
+        person = self._items[slot]
+        last = self._items.pop()
+        if last is not person:
+            self._items[slot] = last
+            self._slots[last.id] = slot
+        del self._slots[person.id]
+        return person
+
+
+class IdRangePool(Mapping):
+    """A pool of people like SamplingPool, created from a range of ids, where the Person object of a person
+    is only created when the person is removed from the pool or looked up.
+
+    It works like a SamplingPool whose list holds the ids, except that the list is not stored:
+    slot i holds the id start + i, unless another id has been moved into it, and only the moved slots
+    are recorded. So the memory used is proportional to the number of people removed from (or added to)
+    the pool, not to the size of the range.
+
+    Private Instance Attributes
+    - _start:
+        The first id of the range.
+    - _size:
+        The number of people in this pool, who are in the slots 0 to _size - 1.
+    - _moved:
+        A mapping from each slot that does not hold its own id (_start + slot) to the id it holds.
+    - _slots:
+        A mapping from each id in _moved to its slot.
+    - _people:
+        The Person objects in this pool that have already been created or added.
+
+    Representation Invariants:
+    - all(self._slots[self._moved[i]] == i for i in self._moved)
+    - all(0 <= i < self._size for i in self._moved)
+    """
+    _start: int
+    _size: int
+    _moved: dict[int, int]
+    _slots: dict[int, int]
+    _people: dict[int, Person]
+
+    def __init__(self, ids: range) -> None:
+        """Initialize this pool with the people whose ids are in the given range.
+
+        Preconditions:
+            - ids.step == 1
+        """
+        self._start = ids.start
+        self._size = len(ids)
+        self._moved = {}
+        self._slots = {}
+        self._people = {}
+
+    def __getitem__(self, identifier: int) -> Person:
+        """Return the person with the given id."""
+        if self._slot_of(identifier) is None:
+            raise KeyError(identifier)
+        if identifier not in self._people:
+            self._people[identifier] = Person(identifier)
+        return self._people[identifier]
+
+    def __iter__(self) -> Iterator[int]:
+        """Return an iterator over the ids of the people in this pool."""
+        return (self._id_at(slot) for slot in range(self._size))
+
+    def __len__(self) -> int:
+        """Return the number of people in this pool."""
+        return self._size
+
+    def __contains__(self, identifier: object) -> bool:
+        """Return whether the person with the given id is in this pool."""
+        return isinstance(identifier, int) and self._slot_of(identifier) is not None
+
+    def __repr__(self) -> str:
+        """Return a string representing this pool, in the same form as a dict.
+        Note: this creates the Person object of everyone in the pool.
+
+        >>> IdRangePool(range(1, 3))
+        {1: id=1, infected_time=None, 2: id=2, infected_time=None}
+        """
+        return repr({p.id: p for p in self.values()})
+
+    def values(self) -> list[Person]:
+        """Return a list of all people in this pool.
+        Note: this creates the Person object of everyone in the pool.
+        """
+        return [self[identifier] for identifier in self]
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this pool as arrays, which from_snapshot creates the same pool from.
+        The Person objects that have been created are not part of it, they are created again when needed.
+        """
+        return {'range': np.array([self._start, self._size], dtype=np.int64),
+                'moved_slots': np.fromiter(self._moved.keys(), dtype=np.int64, count=len(self._moved)),
+                'moved_ids': np.fromiter(self._moved.values(), dtype=np.int64, count=len(self._moved))}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> IdRangePool:
+        """Return a pool with the content returned by snapshot.
+
+        >>> pool = IdRangePool(range(100, 110))
+        >>> _ = pool.sample_and_remove(4)
+        >>> list(IdRangePool.from_snapshot(pool.snapshot())) == list(pool)
+        True
+        """
+        start, size = arrays['range'].tolist()
+        pool = cls(range(start, start + size))
+        pool._moved = dict(zip(arrays['moved_slots'].tolist(), arrays['moved_ids'].tolist()))
+        pool._slots = {identifier: slot for slot, identifier in pool._moved.items()}
+        return pool
+
+    def add(self, person: Person) -> None:
+        """Add the given person to this pool.
+
+        Preconditions:
+            - person.id not in self
+        """
+        self._set_slot(self._size, person.id)
+        self._size += 1
+        self._people[person.id] = person
+
+    def extend(self, people: Iterable[Person]) -> None:
+        """Add all the given people to this pool.
+
+        Preconditions:
+            - all(p.id not in self for p in people)
+        """
+        for p in people:
+            self.add(p)
+
+    def pop(self, identifier: int) -> Person:
+        """Remove and return the person with the given id.
+
+        Preconditions:
+            - identifier in self
+
+        >>> pool = IdRangePool(range(3))
+        >>> pool.pop(0)
+        id=0, infected_time=None
+        >>> sorted(pool)
+        [1, 2]
+        >>> 0 in pool
+        False
+        """
+        return self._pop_slot(self._slot_of(identifier))
+
+    def pop_random(self) -> Person:
+        """Remove and return a random person in this pool.
+
+        Preconditions:
+            - len(self) > 0
+        """
+        return self._pop_slot(random.randrange(self._size))
+
+    def sample_and_remove(self, k: int) -> list[Person]:
+        """Remove and return k distinct random people in this pool.
+        If k >= len(self), all people in this pool are removed.
+
+        Preconditions:
+            - k >= 0
+
+        >>> pool = IdRangePool(range(100, 105))
+        >>> people = pool.sample_and_remove(3)
+        >>> len({p.id for p in people}), len(pool)
+        (3, 2)
+        >>> sorted([p.id for p in people] + list(pool))
+        [100, 101, 102, 103, 104]
+        """
+        if k >= self._size:
+            return self.clear()
+        return [self._pop_slot(random.randrange(self._size)) for _ in range(k)]
+
+    def clear(self) -> list[Person]:
+        """Remove and return all people in this pool."""
+        people = self.values()
+        self._size = 0
+        self._moved = {}
+        self._slots = {}
+        self._people = {}
+        return people
+
+    def _id_at(self, slot: int) -> int:
+        """Return the id held by the given slot."""
+        return self._moved.get(slot, self._start + slot)
+
+    def _slot_of(self, identifier: int) -> Optional[int]:
+        """Return the slot holding the given id, or None if the id is not in this pool."""
+        if identifier in self._slots:
+            return self._slots[identifier]
+        slot = identifier - self._start
+        if 0 <= slot < self._size and slot not in self._moved:
+            return slot
+        return None
+
+    def _set_slot(self, slot: int, identifier: int) -> None:
+        """Let the given slot hold the given id."""
+        if identifier == self._start + slot:
+            self._moved.pop(slot, None)
+            self._slots.pop(identifier, None)
+        else:
+            self._moved[slot] = identifier
+            self._slots[identifier] = slot
+
+    def _pop_slot(self, slot: int) -> Person:
+        """Remove and return the person at the given slot, by moving the last person into the slot."""
+        identifier = self._id_at(slot)
+        last = self._size - 1
+        if slot != last:
+            self._set_slot(slot, self._id_at(last))
+        self._moved.pop(last, None)
+        self._slots.pop(identifier, None)
+        self._size = last
+        if identifier in self._people:
+            return self._people.pop(identifier)
+        return Person(identifier)
+
+
 class Susceptible:
     """
     Instance Attributes
@@ -91,20 +479,33 @@ class Susceptible:
     Representation Invariants:
     - all({self.people[person].id == person for person in self.people})
     """
-    people: dict[int, Person]
+    people: Union[SamplingPool, IdRangePool]
 
-    def __init__(self, people: list[Person]) -> None:
+    def __init__(self, people: Union[list[Person], range]) -> None:
         """Initialize this Susceptible class with the given list of Person.
+        If people is a range of ids instead, the Person objects are only created when they are needed,
+        so creating a large population takes no time.
 
         Preconditions:
-            - all([isinstance(p, Person) for p in people])
+            - all([isinstance(p, Person) for p in people]) or isinstance(people, range)
             - all([p.id not in self.people for p in people])
+
+        >>> s = Susceptible(range(0, 1000000))
+        >>> len(s.remove_by_number(2)), len(s)
+        (2, 999998)
         """
-        mapping = {}
-        for p in people:
-            mapping[p.id] = p
+        if isinstance(people, range):
+            self.people = IdRangePool(people)
+        else:
+            self.people = SamplingPool(people)
 
-        self.people = mapping
+    def __len__(self) -> int:
+        """Return the number of susceptible people.
+
+        >>> len(Susceptible([Person(1), Person(2)]))
+        2
+        """
+        return len(self.people)
 
     def add(self, person: Person) -> None:
         """Add a new Susceptible person.
@@ -120,7 +521,7 @@ class Susceptible:
         >>> len(s.people)
         2
         """
-        self.people[person.id] = person
+        self.people.add(person)
 
     def remove(self, person: Person) -> None:
         """Remove a person that is not susceptible anymore.
@@ -152,34 +553,57 @@ class Susceptible:
         >>> len(s.remove_by_number(10))
         2
         """
-        if len(self.people) == 0:
-            return []
         # if n > len(self.people), then remove all the person in self.people
-        elif n > len(self.people):
-            lst = list(self.people.values())
-            self.people = {}
-            return lst
-        else:
-            lst_so_far = []
-            for _ in range(n):
-                ids = [self.people[p].id for p in self.people]
-                id_to_remove = random.choice(ids)
-                new_p = self.people.pop(id_to_remove)
-                lst_so_far.append(new_p)
+        return self.people.sample_and_remove(n)
 
-            return lst_so_far
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from."""
+        if isinstance(self.people, IdRangePool):
+            return self.people.snapshot()
+        return {'ids': self.people.ids()}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> Susceptible:
+        """Return a group with the content returned by snapshot.
+
+        >>> s = Susceptible([Person(1), Person(2), Person(3)])
+        >>> list(Susceptible.from_snapshot(s.snapshot()).people)
+        [1, 2, 3]
+        """
+        if 'range' in arrays:
+            susceptible = cls([])
+            susceptible.people = IdRangePool.from_snapshot(arrays)
+            return susceptible
+        return cls([Person(identifier) for identifier in arrays['ids'].tolist()])
 
 
 class Infective:
     """
     Instance Attributes
-    - people:
-        A mapping containing all infected people.
+    - day:
+        The number of days that have passed since this Infective object was created.
+        It is used as the global day offset of the cohorts, so that advancing a day does not need to
+        touch any infected person.
+
+    Private Instance Attributes
+    - _cohorts:
+        A queue of the people that are not recoverable yet, grouped by the day they were infected.
+        The last cohort holds the people infected on self.day, the one before it holds the people infected on
+        self.day - 1, and so on. There are at most INFECTIOUS_PERIOD + 1 cohorts.
+    - _recoverable:
+        The people that have been infected for more than INFECTIOUS_PERIOD days.
+    - _infected_on:
+        A mapping from each infected person's id to the day the person was infected.
 
     Representation Invariants:
-    - all({self.people[person].id == person for person in self.people})
+    - 1 <= len(self._cohorts) <= INFECTIOUS_PERIOD + 1
+    - len(self._infected_on) == len(self._recoverable) + sum(len(c) for c in self._cohorts)
+    - all(self.day - self._infected_on[i] > INFECTIOUS_PERIOD for i in self._recoverable)
     """
-    people: dict[int, Person] = {}
+    day: int
+    _cohorts: deque[SamplingPool]
+    _recoverable: SamplingPool
+    _infected_on: dict[int, int]
 
     def __init__(self, people: list[Person]) -> None:
         """Initialize this Infectie class with the given list of Person.
@@ -188,12 +612,35 @@ class Infective:
             - all([isinstance(p, Person) for p in people])
             - all([p.id not in self.people for p in people])
         """
+        self.day = 0
+        self._cohorts = deque([SamplingPool()])
+        self._recoverable = SamplingPool()
+        self._infected_on = {}
         for person in people:
             self.add(person)
 
+    def __len__(self) -> int:
+        """Return the number of infected people."""
+        return len(self._infected_on)
+
+    @property
+    def people(self) -> dict[int, Person]:
+        """A mapping containing all infected people.
+        The infected_time of every infected person is brought up to date when this mapping is built,
+        so it takes time proportional to the number of infected people.
+        """
+        mapping = {}
+        for p in self._recoverable.values():
+            mapping[p.id] = p
+        for cohort in self._cohorts:
+            for p in cohort.values():
+                mapping[p.id] = p
+        for p in mapping.values():
+            p.infected_time = self.day - self._infected_on[p.id]
+        return mapping
+
     def add(self, person: Person) -> None:
         """Add a new infected person.
-        Note: using non-mutating method is required for not causing error.
 
         Preconditions:
             - isinstance(person, Person)
@@ -205,8 +652,9 @@ class Infective:
         >>> len(infective.people)
         1
         """
-        self.people = {**self.people, person.id: person}
-        self.people[person.id].get_infected()
+        self._cohorts[-1].add(person)
+        self._infected_on[person.id] = self.day
+        person.get_infected()
 
     def add_multiple(self, people: list[Person]) -> None:
         """
@@ -239,11 +687,17 @@ class Infective:
         >>> len(infective.people)
         0
         """
+        infected_time = self.day - self._infected_on.pop(person.id)
+        if infected_time > INFECTIOUS_PERIOD:
+            self._recoverable.pop(person.id)
+        else:
+            self._cohorts[-1 - infected_time].pop(person.id)
         person.infected_time = None
-        self.people.pop(person.id)
 
     def remove_by_number(self, n: int) -> list[Person]:
         """Remove n number of people that are not infected anymore.
+        Only recoverable people can be removed, so fewer than n people are removed if there are not enough
+        recoverable people.
 
         Preconditions:
             - isinstance(n, int)
@@ -258,27 +712,15 @@ class Infective:
         >>> len(infective.remove_by_number(1))
         0
         """
-        if len(self.people) == 0 or n == 0:
-            return []
-        lst_so_far = []
-        for _ in range(n):
-            # a infected person is possible to recover only if its infected_time > 14
-            ids = [self.people[p].id for p in self.people if self.people[p].infected_time > 14]
-            if len(ids) == 0:
-                return []
-            elif len(ids) != 1:
-                id_to_remove = random.choice(ids)
-            else:
-                id_to_remove = ids[0]
-
-            new_p = self.people.pop(id_to_remove)
-            new_p.infected_time = None
-            lst_so_far.append(new_p)
-
-        return lst_so_far
-
-    def increment_day(self) -> None:
-        """Add the person's infected_time by 1.
+        removed = self._recoverable.sample_and_remove(n)
+        for p in removed:
+            del self._infected_on[p.id]
+            p.infected_time = None
+        return removed
+
+    def increment_day(self, days: int = 1) -> None:
+        """Add the person's infected_time by days (1 by default).
+        The cohorts that have been infected for more than INFECTIOUS_PERIOD days become recoverable.
 
         Preconditions:
             - all([isinstance(p, Person) for p in self.people.values()])
@@ -292,8 +734,49 @@ class Infective:
     >>> i.people[2].infected_time
     1
         """
-        for p in self.people.values():
-            p.add_infected_day()
+        self.day += days
+        # After INFECTIOUS_PERIOD + 1 days, every cohort there was has become recoverable.
+        for _ in range(min(days, INFECTIOUS_PERIOD + 1)):
+            self._cohorts.append(SamplingPool())
+            if len(self._cohorts) > INFECTIOUS_PERIOD + 1:
+                self._recoverable.extend(self._cohorts.popleft().clear())
+
+    def quiet_days(self) -> int:
+        """Return the number of days from today on on which nobody is recoverable,
+        that is, 0 if someone is recoverable, or the number of days until the oldest cohort becomes recoverable.
+
+        Preconditions:
+            - len(self) > 0
+
+        >>> i = Infective([Person(1)])
+        >>> i.increment_day(5)
+        >>> i.quiet_days()
+        10
+        """
+        if len(self._recoverable) > 0:
+            return 0
+        oldest = next(position for position, cohort in enumerate(self._cohorts) if len(cohort) > 0)
+        return INFECTIOUS_PERIOD + 2 - len(self._cohorts) + oldest
+
+    def advance_quiescent(self, a: float, days: float) -> tuple[int, list[Person], int]:
+        """Simulate at most the given number of days on which nobody is infected, with removal rate a,
+        as in InfectiveCount.advance_quiescent, and return the same values.
+
+        Removing people draws random numbers, which must stay in the order of the normal days of all states,
+        so only the days on which nobody is recoverable are simulated, which only make the infected people older.
+
+        Preconditions:
+            - days >= 0
+
+        >>> i = Infective([Person(1)])
+        >>> i.advance_quiescent(0.5, 100)
+        (15, [], 0)
+        >>> i.num_recoverable()
+        1
+        """
+        simulated = min(days, self.quiet_days()) if len(self) > 0 else 0
+        self.increment_day(simulated)
+        return simulated, [], 0
 
     def get_recoverable(self) -> list[Person]:
         """Return all the recoverable people in a list.
@@ -308,7 +791,58 @@ class Infective:
         >>> len(i.get_recoverable())
         0
         """
-        return [p for p in self.people.values() if p.infected_time > 14]
+        recoverable = self._recoverable.values()
+        for p in recoverable:
+            p.infected_time = self.day - self._infected_on[p.id]
+        return recoverable
+
+    def num_recoverable(self) -> int:
+        """Return the number of recoverable people.
+
+        >>> p1 = Person(1)
+        >>> i = Infective([p1])
+        >>> for _ in range(INFECTIOUS_PERIOD + 1):
+        ...     i.increment_day()
+        >>> i.num_recoverable()
+        1
+        """
+        return len(self._recoverable)
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from:
+        the ids of every cohort and of the recoverable people in the order of their slots,
+        and the day every one of them was infected.
+        """
+        ids = np.concatenate([pool.ids() for pool in self._cohorts] + [self._recoverable.ids()])
+        return {'day': np.array(self.day, dtype=np.int64),
+                'cohort_sizes': np.array([len(pool) for pool in self._cohorts], dtype=np.int64),
+                'ids': ids,
+                'infected_on': np.array([self._infected_on[i] for i in ids.tolist()], dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> Infective:
+        """Return a group with the content returned by snapshot.
+
+        >>> i = Infective([Person(1), Person(2)])
+        >>> i.increment_day()
+        >>> i.add(Person(3))
+        >>> sorted((p.id, p.infected_time) for p in Infective.from_snapshot(i.snapshot()).people.values())
+        [(1, 1), (2, 1), (3, 0)]
+        """
+        infective = cls([])
+        infective.day = int(arrays['day'])
+        people = [Person(identifier) for identifier in arrays['ids'].tolist()]
+        infected_on = arrays['infected_on'].tolist()
+        for person, day in zip(people, infected_on):
+            person.infected_time = infective.day - day
+        infective._infected_on = dict(zip(arrays['ids'].tolist(), infected_on))
+        infective._cohorts = deque()
+        start = 0
+        for size in arrays['cohort_sizes'].tolist():
+            infective._cohorts.append(SamplingPool(people[start:start + size]))
+            start += size
+        infective._recoverable = SamplingPool(people[start:])
+        return infective
 
 
 class Removal:
@@ -320,7 +854,7 @@ class Removal:
     Representation Invariants:
     - all({self.people[person].id == person for person in self.people})
     """
-    people: dict[int, Person]
+    people: SamplingPool
 
     def __init__(self, people: list[Person]) -> None:
         """Initialize this Removal object with the given list of people.
@@ -336,11 +870,11 @@ class Removal:
         >>> r.people[2] == p2
         True
         """
-        mapping = {}
-        for p in people:
-            mapping[p.id] = p
+        self.people = SamplingPool(people)
 
-        self.people = mapping
+    def __len__(self) -> int:
+        """Return the number of removed people."""
+        return len(self.people)
 
     def add(self, person: Person) -> None:
         """Add the given people in Removal.
@@ -355,7 +889,7 @@ class Removal:
         >>> r.people[1] == p
         True
         """
-        self.people[person.id] = person
+        self.people.add(person)
 
     def add_multiple(self, people: list[Person]) -> None:
         """Add the given people in Removal.
@@ -370,8 +904,770 @@ class Removal:
         >>> r.people[1] == p1 and r.people[2] == p2
         True
         """
-        for p in people:
-            self.add(p)
+        self.people.extend(people)
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from."""
+        return {'ids': self.people.ids()}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> Removal:
+        """Return a group with the content returned by snapshot."""
+        return cls([Person(identifier) for identifier in arrays['ids'].tolist()])
+
+
+class SusceptibleCount:
+    """Count-based counterpart of Susceptible, only the number of susceptible people is kept.
+
+    Instance Attributes
+    - size:
+        The number of susceptible people.
+
+    Representation Invariants:
+    - self.size >= 0
+    """
+    size: int
+
+    def __init__(self, size: int) -> None:
+        """Initialize this SusceptibleCount with the given number of people.
+
+        Preconditions:
+            - size >= 0
+        """
+        self.size = size
+
+    def __len__(self) -> int:
+        """Return the number of susceptible people."""
+        return self.size
+
+    def remove_by_number(self, n: int) -> int:
+        """Remove n number of people that are not susceptible anymore, and return the number of people
+        actually removed.
+
+        Preconditions:
+            - n >= 0
+
+        >>> s = SusceptibleCount(4)
+        >>> s.remove_by_number(2)
+        2
+        >>> s.remove_by_number(10)
+        2
+        >>> len(s)
+        0
+        """
+        removed = min(n, self.size)
+        self.size -= removed
+        return removed
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from."""
+        return {'size': np.array(self.size, dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> SusceptibleCount:
+        """Return a group with the content returned by snapshot."""
+        return cls(int(arrays['size']))
+
+
+class InfectiveCount:
+    """Count-based counterpart of Infective, infected people are grouped by the number of days
+    they have been infected.
+
+    Instance Attributes
+    - days:
+        A histogram of infected people, days[d] is the number of people that have been infected for d days
+        for 0 <= d <= INFECTIOUS_PERIOD, and days[INFECTIOUS_PERIOD + 1] is the number of recoverable people,
+        who have been infected for more than INFECTIOUS_PERIOD days.
+    - size:
+        The number of infected people.
+
+    Representation Invariants:
+    - len(self.days) == INFECTIOUS_PERIOD + 2
+    - all(n >= 0 for n in self.days)
+    - self.size == sum(self.days)
+    """
+    days: list[int]
+    size: int
+
+    def __init__(self, n: int = 0) -> None:
+        """Initialize this InfectiveCount with n newly infected people.
+
+        Preconditions:
+            - n >= 0
+        """
+        self.days = [0] * (INFECTIOUS_PERIOD + 2)
+        self.days[0] = n
+        self.size = n
+
+    def __len__(self) -> int:
+        """Return the number of infected people."""
+        return self.size
+
+    def add_multiple(self, n: int) -> None:
+        """Add n newly infected people.
+
+        Preconditions:
+            - n >= 0
+
+        >>> i = InfectiveCount()
+        >>> i.add_multiple(3)
+        >>> len(i), i.days[0]
+        (3, 3)
+        """
+        self.days[0] += n
+        self.size += n
+
+    def remove_by_number(self, n: int) -> int:
+        """Remove n number of recoverable people, and return the number of people actually removed.
+
+        Preconditions:
+            - n >= 0
+
+        >>> i = InfectiveCount(2)
+        >>> i.remove_by_number(1)
+        0
+        """
+        removed = min(n, self.days[-1])
+        self.days[-1] -= removed
+        self.size -= removed
+        return removed
+
+    def increment_day(self, days: int = 1) -> None:
+        """Add the infected time of every infected people by days (1 by default),
+        which shifts the histogram by days at once.
+
+        >>> i = InfectiveCount(1)
+        >>> for _ in range(INFECTIOUS_PERIOD):
+        ...     i.increment_day()
+        >>> i.num_recoverable()
+        0
+        >>> i.increment_day(3)
+        >>> i.num_recoverable()
+        1
+        """
+        histogram = self.days
+        cohorts = len(histogram) - 1
+        shift = min(days, cohorts)
+        histogram[-1] += sum(histogram[cohorts - shift:cohorts])
+        histogram[shift:cohorts] = histogram[:cohorts - shift]
+        histogram[:shift] = [0] * shift
+
+    def advance_quiescent(self, a: float, days: float) -> tuple[int, int, int]:
+        """Simulate at most the given number of days on which nobody is infected, with removal rate a:
+        on every day, math.ceil(a * self.num_recoverable()) recoverable people are removed, and then
+        increment_day is called. Stop once there is no infected people.
+        Return the number of days simulated, the number of people removed on them, and the number of people
+        removed on the last of them.
+
+        Only the number of recoverable people is followed day by day, and the histogram is shifted once at the end.
+
+        Preconditions:
+            - days >= 0
+
+        >>> i = InfectiveCount(30)
+        >>> i.advance_quiescent(0.5, 100)
+        (20, 30, 1)
+        >>> len(i)
+        0
+        """
+        histogram = self.days
+        cohorts = len(histogram) - 1
+        recoverable = histogram[-1]
+        size = self.size
+        simulated = removed = last_removed = 0
+        while simulated < days and size > 0:
+            last_removed = min(math.ceil(a * recoverable), recoverable)
+            recoverable -= last_removed
+            size -= last_removed
+            removed += last_removed
+            # The cohort that becomes recoverable at the end of this day.
+            if simulated < cohorts:
+                recoverable += histogram[cohorts - 1 - simulated]
+            simulated += 1
+        shift = min(simulated, cohorts)
+        histogram[shift:cohorts] = histogram[:cohorts - shift]
+        histogram[:shift] = [0] * shift
+        histogram[-1] = recoverable
+        self.size = size
+        return simulated, removed, last_removed
+
+    def num_recoverable(self) -> int:
+        """Return the number of recoverable people."""
+        return self.days[-1]
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from."""
+        return {'days': np.array(self.days, dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> InfectiveCount:
+        """Return a group with the content returned by snapshot.
+
+        >>> i = InfectiveCount(5)
+        >>> i.increment_day()
+        >>> InfectiveCount.from_snapshot(i.snapshot()).days == i.days
+        True
+        """
+        infective = cls()
+        infective.days = arrays['days'].tolist()
+        infective.size = sum(infective.days)
+        return infective
+
+
+class RemovalCount:
+    """Count-based counterpart of Removal, only the number of removed people is kept.
+
+    Instance Attributes
+    - size:
+        The number of recovered or dead people.
+
+    Representation Invariants:
+    - self.size >= 0
+    """
+    size: int
+
+    def __init__(self, size: int = 0) -> None:
+        """Initialize this RemovalCount with the given number of people.
+
+        Preconditions:
+            - size >= 0
+        """
+        self.size = size
+
+    def __len__(self) -> int:
+        """Return the number of removed people."""
+        return self.size
+
+    def add_multiple(self, n: int) -> None:
+        """Add n removed people.
+
+        Preconditions:
+            - n >= 0
+
+        >>> r = RemovalCount()
+        >>> r.add_multiple(2)
+        >>> len(r)
+        2
+        """
+        self.size += n
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from."""
+        return {'size': np.array(self.size, dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray]) -> RemovalCount:
+        """Return a group with the content returned by snapshot."""
+        return cls(int(arrays['size']))
+
+
+class AgentTable:
+    """The people of all states in one table, stored by column and indexed by person id,
+    so every person takes a few bytes instead of a Person object.
+    SusceptibleTable, InfectiveTable and RemovalTable are the groups of people of one state on top of this table.
+
+    The people of a state have a contiguous range of ids, and the same range of the order column holds
+    a permutation of these ids, split into the susceptible people, the infected people from the newest cohort
+    to the oldest one, the recoverable people, and the removed people. Moving people between the groups
+    only moves the boundaries between these parts, so a simulated day does not copy any ids.
+
+    If the table is created with a path, the columns are memory-mapped .npy files in that folder,
+    so the operating system keeps only the recently used parts in memory (see flush), and the files can be
+    opened after the simulation with load_store.
+
+    Instance Attributes
+    - compartment:
+        compartment[i] is the group person i is in, one of SUSCEPTIBLE, INFECTIVE and REMOVED.
+    - infected_day:
+        infected_day[i] is the day (counted by the InfectiveTable of the person's state) on which
+        person i was infected. It is only meaningful if person i is not susceptible.
+    - order:
+        The permutation of the ids of every state, as described above.
+    - rng:
+        The random number generator for choosing people, seeded from the random module,
+        so random.seed makes the simulation reproducible.
+    - path:
+        The folder of the memory-mapped columns, or None if the columns are in memory.
+
+    Representation Invariants:
+    - len(self.compartment) == len(self.infected_day) == len(self.order)
+    """
+    compartment: np.ndarray
+    infected_day: np.ndarray
+    order: np.ndarray
+    rng: np.random.Generator
+    path: Optional[str]
+
+    def __init__(self, size: int, path: Optional[str] = None) -> None:
+        """Initialize a table of size susceptible people, with the ids 0 to size - 1.
+        If path is given, the columns are memory-mapped files in the folder with this path,
+        which is created if needed. The files are sparse, so creating a table takes no time.
+
+        Preconditions:
+            - size >= 0
+        """
+        self.path = path
+        if path is None:
+            self.compartment = np.zeros(size, dtype=np.int8)
+            self.infected_day = np.zeros(size, dtype=np.int32)
+            self.order = np.zeros(size, dtype=np.int32)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.compartment, self.infected_day, self.order = [
+                np.lib.format.open_memmap(os.path.join(path, column + '.npy'), mode='w+', dtype=dtype, shape=(size,))
+                for column, dtype in STORE_COLUMNS]
+        self.rng = np.random.default_rng(random.getrandbits(64))
+
+    def __len__(self) -> int:
+        """Return the number of people in the table."""
+        return len(self.compartment)
+
+    def flush(self) -> None:
+        """Write the changes of the memory-mapped columns to their files, and let the operating system
+        release the memory they use, so the memory used by a simulation stays bounded.
+        It does nothing if the columns are in memory.
+        """
+        if self.path is None:
+            return
+        for column in (self.compartment, self.infected_day, self.order):
+            column.flush()
+            # pylint: disable=protected-access
+            if hasattr(mmap, 'MADV_DONTNEED') and getattr(column, '_mmap', None) is not None:
+                column._mmap.madvise(mmap.MADV_DONTNEED)
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this table as arrays, which from_snapshot creates the same table from:
+        the columns (without copying them) and the state of the random number generator.
+        """
+        return {'compartment': self.compartment, 'infected_day': self.infected_day, 'order': self.order,
+                'rng': np.array(json.dumps(self.rng.bit_generator.state))}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray], path: Optional[str] = None) -> AgentTable:
+        """Return a table with the content returned by snapshot.
+        If path is None, the table uses the given columns, otherwise they are copied to memory-mapped files
+        in the folder with this path, as in the constructor.
+
+        >>> table = AgentTable(4)
+        >>> _ = SusceptibleTable(table, range(0, 4)).remove_by_number(2)
+        >>> again = AgentTable.from_snapshot(table.snapshot())
+        >>> again.rng.random() == table.rng.random()
+        True
+        """
+        size = len(arrays['compartment'])
+        table = cls(0 if path is None else size, path)
+        if path is None:
+            table.compartment, table.infected_day, table.order = \
+                arrays['compartment'], arrays['infected_day'], arrays['order']
+        else:
+            for column, _ in STORE_COLUMNS:
+                for start in range(0, size, SAMPLE_CHUNK):
+                    getattr(table, column)[start:start + SAMPLE_CHUNK] = arrays[column][start:start + SAMPLE_CHUNK]
+        table.rng.bit_generator.state = json.loads(str(arrays['rng']))
+        return table
+
+
+def load_store(path: str) -> dict[str, np.ndarray]:
+    """Return the columns saved in the given folder by an AgentTable created with this path,
+    as read-only memory-mapped arrays, without loading them into memory.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     table = AgentTable(5, folder)
+    ...     InfectiveTable(table, range(0, 5)).add_multiple(SusceptibleTable(table, range(0, 5)).remove_by_number(2))
+    ...     table.flush()
+    ...     int((load_store(folder)['compartment'] == INFECTIVE).sum())
+    2
+    """
+    return {column: np.load(os.path.join(path, column + '.npy'), mmap_mode='r') for column, _ in STORE_COLUMNS}
+
+
+def _choose_slots(size: int, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Return k distinct random slots from 0 to size - 1, using memory proportional to k rather than size.
+
+    Preconditions:
+        - 0 <= k <= size
+    """
+    if size <= 4 * SAMPLE_CHUNK:
+        return rng.choice(size, k, replace=False)
+    # The distinct values of a sequence of random slots are a random set of slots, and since k is small
+    # compared to size, only a few more slots are drawn to replace the repeated ones.
+    slots = np.sort(rng.integers(size, size=k))
+    slots = slots[np.concatenate(([True], slots[1:] != slots[:-1]))]
+    while len(slots) < k:
+        slots = np.sort(np.concatenate([slots, rng.integers(size, size=k - len(slots))]))
+        slots = slots[np.concatenate(([True], slots[1:] != slots[:-1]))]
+    return rng.permutation(slots)
+
+
+def _sample_to_end(pool: np.ndarray, size: int, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Move k distinct random ids of the first size ids of pool into the slots size - k to size - 1,
+    and return these slots of pool (a view, not a copy). The other ids are kept in the first size - k slots.
+
+    Preconditions:
+        - 0 <= k <= size <= len(pool)
+    """
+    if k == size or k == 0:
+        return pool[size - k:size]
+    if k <= SMALL_SAMPLE:
+        # A partial Fisher-Yates shuffle, which moves the chosen ids into the last k slots.
+        draws = rng.random(k)
+        for t in range(k):
+            last = size - 1 - t
+            j = int(draws[t] * (last + 1))
+            pool[j], pool[last] = pool[last], pool[j]
+        return pool[size - k:size]
+
+    # Choose at most SAMPLE_CHUNK ids at a time, each round moves its ids just before the ones of the last round.
+    end = size
+    while end > size - k:
+        n = min(SAMPLE_CHUNK, end - (size - k))
+        slots = _choose_slots(end, n, rng)
+        in_tail = slots >= end - n
+        tail = np.ones(n, dtype=bool)
+        tail[slots[in_tail] - (end - n)] = False
+        holes = slots[~in_tail]
+        kept = np.flatnonzero(tail) + (end - n)
+        chosen = pool[holes]
+        pool[holes] = pool[kept]
+        pool[kept] = chosen
+        end -= n
+    return pool[size - k:size]
+
+
+class SusceptibleTable:
+    """Agent table counterpart of Susceptible, a view of the susceptible people of one state in an AgentTable.
+    The susceptible people are the first part of the state's range of the order column.
+
+    Instance Attributes
+    - table:
+        The table of all people.
+
+    Private Instance Attributes
+    - _ids:
+        The range of the ids of the people of this state.
+    - _size:
+        The number of susceptible people.
+    - _ready:
+        Whether the state's range of the order column has been filled with the ids. It is only filled
+        when someone leaves the group, so the states that are never infected do not write to the table.
+
+    Representation Invariants:
+    - 0 <= self._size <= len(self._ids)
+    """
+    table: AgentTable
+    _ids: range
+    _size: int
+    _ready: bool
+
+    def __init__(self, table: AgentTable, ids: range) -> None:
+        """Initialize the susceptible group of the people of the given table with the given ids.
+
+        Preconditions:
+            - ids.step == 1 and 0 <= ids.start <= ids.stop <= len(table)
+            - all people with the given ids are susceptible
+        """
+        self.table = table
+        self._ids = ids
+        self._size = len(ids)
+        self._ready = False
+
+    def __len__(self) -> int:
+        """Return the number of susceptible people."""
+        return self._size
+
+    def ids(self) -> np.ndarray:
+        """Return the ids of the susceptible people."""
+        if not self._ready:
+            return np.arange(self._ids.start, self._ids.stop, dtype=np.int32)
+        return self.table.order[self._ids.start:self._ids.start + self._size].copy()
+
+    def remove_by_number(self, n: int) -> np.ndarray:
+        """Remove n number of random people that are not susceptible anymore, and return their ids.
+        The ids are a view of the table, which must be given to the InfectiveTable of the same state
+        before this group changes again.
+
+        Preconditions:
+            - n >= 0
+
+        >>> table = AgentTable(10)
+        >>> s = SusceptibleTable(table, range(0, 10))
+        >>> people = s.remove_by_number(4)
+        >>> len(set(people.tolist())), len(s)
+        (4, 6)
+        >>> sorted(people.tolist() + s.ids().tolist()) == list(range(10))
+        True
+        """
+        k = min(n, self._size)
+        pool = self.table.order[self._ids.start:self._ids.stop]
+        if not self._ready:
+            for start in range(0, len(pool), SAMPLE_CHUNK):
+                end = min(start + SAMPLE_CHUNK, len(pool))
+                pool[start:end] = np.arange(self._ids.start + start, self._ids.start + end, dtype=np.int32)
+            self._ready = True
+        removed = _sample_to_end(pool, self._size, k, self.table.rng)
+        self._size -= k
+        return removed
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from,
+        with the AgentTable of the same content.
+        """
+        return {'range': np.array([self._ids.start, self._ids.stop], dtype=np.int64),
+                'state': np.array([self._size, self._ready], dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray], table: AgentTable) -> SusceptibleTable:
+        """Return a group of the people of the given table with the content returned by snapshot.
+
+        Preconditions:
+            - table has the content of the table of the group when snapshot was called
+        """
+        start, stop = arrays['range'].tolist()
+        susceptible = cls(table, range(start, stop))
+        susceptible._size, ready = arrays['state'].tolist()
+        susceptible._ready = bool(ready)
+        return susceptible
+
+
+class InfectiveTable:
+    """Agent table counterpart of Infective, a view of the infected people of one state in an AgentTable.
+    The infected people are the part of the state's range of the order column after the susceptible people,
+    from the newest cohort to the oldest one, followed by the recoverable people.
+
+    Instance Attributes
+    - day:
+        The number of days that have passed since this InfectiveTable was created, the days in
+        AgentTable.infected_day of the people of this state are counted by it.
+    - table:
+        The table of all people.
+
+    Private Instance Attributes
+    - _ids:
+        The range of the ids of the people of this state.
+    - _start:
+        The first slot of the infected people in the order column.
+    - _recoverable_start:
+        The first slot of the recoverable people in the order column.
+    - _end:
+        The slot after the last recoverable person, which is the first slot of the removed people.
+    - _cohorts:
+        A queue of the number of people that are not recoverable yet, grouped by the day they were infected
+        as in Infective.
+
+    Representation Invariants:
+    - self._ids.start <= self._start <= self._recoverable_start <= self._end <= self._ids.stop
+    - 1 <= len(self._cohorts) <= INFECTIOUS_PERIOD + 1
+    - sum(self._cohorts) == self._recoverable_start - self._start
+    """
+    day: int
+    table: AgentTable
+    _ids: range
+    _start: int
+    _recoverable_start: int
+    _end: int
+    _cohorts: deque[int]
+
+    def __init__(self, table: AgentTable, ids: range) -> None:
+        """Initialize an empty infective group of the people of the given table with the given ids.
+
+        Preconditions:
+            - ids.step == 1 and 0 <= ids.start <= ids.stop <= len(table)
+        """
+        self.day = 0
+        self.table = table
+        self._ids = ids
+        self._start = self._recoverable_start = self._end = ids.stop
+        self._cohorts = deque([0])
+
+    def __len__(self) -> int:
+        """Return the number of infected people."""
+        return self._end - self._start
+
+    def ids(self) -> np.ndarray:
+        """Return the ids of the infected people."""
+        return self.table.order[self._start:self._end].copy()
+
+    def infected_time(self, ids: np.ndarray) -> np.ndarray:
+        """Return the number of days the people with the given ids have been infected.
+
+        Preconditions:
+            - all the people with the given ids are in this group
+
+        >>> table = AgentTable(3)
+        >>> s, i = SusceptibleTable(table, range(0, 3)), InfectiveTable(table, range(0, 3))
+        >>> i.add_multiple(s.remove_by_number(2))
+        >>> i.increment_day()
+        >>> i.add_multiple(s.remove_by_number(1))
+        >>> sorted(i.infected_time(i.ids()).tolist())
+        [0, 1, 1]
+        """
+        return self.day - self.table.infected_day[ids]
+
+    def add_multiple(self, ids: np.ndarray) -> None:
+        """Add the newly infected people with the given ids.
+
+        Preconditions:
+            - ids was just returned by remove_by_number of the SusceptibleTable of the same state
+        """
+        for start in range(0, len(ids), SAMPLE_CHUNK):
+            chunk = ids[start:start + SAMPLE_CHUNK]
+            self.table.compartment[chunk] = INFECTIVE
+            self.table.infected_day[chunk] = self.day
+        self._start -= len(ids)
+        self._cohorts[-1] += len(ids)
+
+    def remove_by_number(self, n: int) -> np.ndarray:
+        """Remove n number of random recoverable people, and return their ids.
+        Fewer than n people are removed if there are not enough recoverable people.
+        The ids are a view of the table, which must be given to the RemovalTable of the same state
+        before this group changes again.
+
+        Preconditions:
+            - n >= 0
+
+        >>> table = AgentTable(2)
+        >>> i = InfectiveTable(table, range(0, 2))
+        >>> i.add_multiple(SusceptibleTable(table, range(0, 2)).remove_by_number(2))
+        >>> len(i.remove_by_number(1))
+        0
+        >>> for _ in range(INFECTIOUS_PERIOD + 1):
+        ...     i.increment_day()
+        >>> len(i.remove_by_number(1)), len(i)
+        (1, 1)
+        """
+        k = min(n, self.num_recoverable())
+        pool = self.table.order[self._recoverable_start:self._end]
+        removed = _sample_to_end(pool, len(pool), k, self.table.rng)
+        self._end -= k
+        return removed
+
+    def increment_day(self, days: int = 1) -> None:
+        """Add the infected time of every infected person by days (1 by default).
+        The cohorts that have been infected for more than INFECTIOUS_PERIOD days become recoverable,
+        which only moves the boundary of the recoverable people.
+        """
+        self.day += days
+        for _ in range(min(days, INFECTIOUS_PERIOD + 1)):
+            self._cohorts.append(0)
+            if len(self._cohorts) > INFECTIOUS_PERIOD + 1:
+                self._recoverable_start -= self._cohorts.popleft()
+
+    def quiet_days(self) -> int:
+        """Return the number of days from today on on which nobody is recoverable, as in Infective.quiet_days.
+
+        Preconditions:
+            - len(self) > 0
+        """
+        if self._end > self._recoverable_start:
+            return 0
+        oldest = next(position for position, cohort in enumerate(self._cohorts) if cohort > 0)
+        return INFECTIOUS_PERIOD + 2 - len(self._cohorts) + oldest
+
+    def advance_quiescent(self, a: float, days: float) -> tuple[int, np.ndarray, int]:
+        """Simulate at most the given number of days on which nobody is infected, with removal rate a,
+        as in Infective.advance_quiescent, and return the same values, with an empty array of removed ids.
+
+        Preconditions:
+            - days >= 0
+        """
+        simulated = min(days, self.quiet_days()) if len(self) > 0 else 0
+        self.increment_day(simulated)
+        return simulated, self.table.order[self._end:self._end], 0
+
+    def num_recoverable(self) -> int:
+        """Return the number of recoverable people."""
+        return self._end - self._recoverable_start
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from,
+        with the AgentTable of the same content.
+        """
+        return {'range': np.array([self._ids.start, self._ids.stop], dtype=np.int64),
+                'state': np.array([self.day, self._start, self._recoverable_start, self._end], dtype=np.int64),
+                'cohort_sizes': np.array(self._cohorts, dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray], table: AgentTable) -> InfectiveTable:
+        """Return a group of the people of the given table with the content returned by snapshot.
+
+        Preconditions:
+            - table has the content of the table of the group when snapshot was called
+        """
+        start, stop = arrays['range'].tolist()
+        infective = cls(table, range(start, stop))
+        infective.day, infective._start, infective._recoverable_start, infective._end = arrays['state'].tolist()
+        infective._cohorts = deque(arrays['cohort_sizes'].tolist())
+        return infective
+
+
+class RemovalTable:
+    """Agent table counterpart of Removal, a view of the removed people of one state in an AgentTable.
+    The removed people are the last part of the state's range of the order column.
+
+    Instance Attributes
+    - table:
+        The table of all people.
+
+    Private Instance Attributes
+    - _ids:
+        The range of the ids of the people of this state.
+    - _size:
+        The number of removed people.
+
+    Representation Invariants:
+    - 0 <= self._size <= len(self._ids)
+    """
+    table: AgentTable
+    _ids: range
+    _size: int
+
+    def __init__(self, table: AgentTable, ids: range) -> None:
+        """Initialize an empty removal group of the people of the given table with the given ids.
+
+        Preconditions:
+            - ids.step == 1 and 0 <= ids.start <= ids.stop <= len(table)
+        """
+        self.table = table
+        self._ids = ids
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of removed people."""
+        return self._size
+
+    def ids(self) -> np.ndarray:
+        """Return the ids of the removed people."""
+        return self.table.order[self._ids.stop - self._size:self._ids.stop].copy()
+
+    def add_multiple(self, ids: np.ndarray) -> None:
+        """Add the removed people with the given ids.
+
+        Preconditions:
+            - ids was just returned by remove_by_number of the InfectiveTable of the same state
+        """
+        for start in range(0, len(ids), SAMPLE_CHUNK):
+            self.table.compartment[ids[start:start + SAMPLE_CHUNK]] = REMOVED
+        self._size += len(ids)
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Return the content of this group as arrays, which from_snapshot creates the same group from,
+        with the AgentTable of the same content.
+        """
+        return {'range': np.array([self._ids.start, self._ids.stop], dtype=np.int64),
+                'size': np.array(self._size, dtype=np.int64)}
+
+    @classmethod
+    def from_snapshot(cls, arrays: dict[str, np.ndarray], table: AgentTable) -> RemovalTable:
+        """Return a group of the people of the given table with the content returned by snapshot.
+
+        Preconditions:
+            - table has the content of the table of the group when snapshot was called
+        """
+        start, stop = arrays['range'].tolist()
+        removal = cls(table, range(start, stop))
+        removal._size = int(arrays['size'])
+        return removal
 
 
 if __name__ == '__main__':
@@ -381,6 +1677,6 @@ if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['random'],
+        'extra-imports': ['json', 'math', 'mmap', 'os', 'random', 'numpy'],
         'disable': ['W0622']
     })
@@ -0,0 +1,227 @@
+"""CSC111 Winter 2023 Course Project: Spatial Index
+
+Instructions
+===============================
+
+This Python module contains the functions for measuring the distance between states,
+and SpatialIndex, which finds the best state to infect next without scoring every state.
+
+Distances are great-circle distances, measured in degrees of arc, so they are on the same scale as
+the latitude and longitude of the states. All distances between the states are computed once when
+the SpatialIndex is created, and the states are stored in a k-d tree of their positions on the unit sphere.
+Each node of the tree also keeps the minimum weight (the part of the score that does not depend on the distance)
+of its states, which is updated only when a weight changes. A query only visits the parts of the tree that can
+contain a state with a lower score than the best one found so far, which is about O(log n) for n states
+instead of scoring all n states.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import heapq
+import math
+from typing import Callable, Optional
+
+import numpy as np
+
+# The maximum number of states in a leaf of the k-d tree
+LEAF_SIZE = 8
+# Margin subtracted from the lower bounds of the distances, so rounding errors never hide a state
+BOUND_MARGIN = 1e-9
+
+
+def great_circle_distance(location1: tuple[float, float], location2: tuple[float, float]) -> float:
+    """Return the great-circle distance in degrees of arc between the two given (latitude, longitude) locations.
+
+    >>> round(great_circle_distance((0.0, 0.0), (0.0, 90.0)), 6)
+    90.0
+    >>> great_circle_distance((45.0, 10.0), (45.0, 10.0))
+    0.0
+    """
+    lat1, lon1 = math.radians(location1[0]), math.radians(location1[1])
+    lat2, lon2 = math.radians(location2[0]), math.radians(location2[1])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return math.degrees(2 * math.asin(min(1.0, math.sqrt(h))))
+
+
+def distance_matrix(locations: list[tuple[float, float]]) -> np.ndarray:
+    """Return the matrix of the great-circle distances in degrees of arc between every two given locations.
+
+    >>> matrix = distance_matrix([(0.0, 0.0), (0.0, 90.0), (90.0, 0.0)])
+    >>> matrix.round(6).tolist()
+    [[0.0, 90.0, 90.0], [90.0, 0.0, 90.0], [90.0, 90.0, 0.0]]
+    """
+    coordinates = np.radians(np.array(locations, dtype=np.float64).reshape((len(locations), 2)))
+    lat, lon = coordinates[:, 0:1], coordinates[:, 1:2]
+    h = np.sin((lat.T - lat) / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin((lon.T - lon) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.minimum(1.0, np.sqrt(h))))
+
+
+class SpatialIndex:
+    """The distances between all states, and a k-d tree of the states for finding the best next state to infect.
+
+    Every state has a weight, the part of its score as the next state to infect that does not depend on
+    the distance, and every node of the tree keeps the minimum weight of its states. A weight is only updated
+    with set_weight when it changes, which takes O(log n), so a query can skip the nodes whose states are
+    all too far away or have too high weights without looking at their states.
+
+    Instance Attributes
+    - distances: distances[i, j] is the great-circle distance in degrees of arc between state i and state j
+
+    Private Instance Attributes
+    - _points: The position of each state on the unit sphere.
+    - _nodes: The nodes of the k-d tree, the first one is the root. Each node is a tuple of
+      the lower and upper corners of the box containing its states, the indices of its two children,
+      and the list of its states if it is a leaf (None otherwise).
+    - _parents: The index of the parent of each node, -1 for the root.
+    - _leaves: The index of the leaf containing each state.
+    - _weights: The weight of each state, math.inf if the state cannot be chosen.
+    - _min_weights: The minimum weight of the states in each node.
+
+    Representation Invariants:
+    - self.distances.shape == (len(self._points), len(self._points))
+    - len(self._weights) == len(self._points) == len(self._leaves)
+    - len(self._parents) == len(self._nodes) == len(self._min_weights)
+    - all(w >= 0.0 for w in self._weights)
+    """
+    distances: np.ndarray
+    _points: list[tuple[float, float, float]]
+    _nodes: list[tuple[tuple[float, ...], tuple[float, ...], int, int, Optional[list[int]]]]
+    _parents: list[int]
+    _leaves: list[int]
+    _weights: list[float]
+    _min_weights: list[float]
+
+    def __init__(self, locations: list[tuple[float, float]]) -> None:
+        """Compute the distances between the given (latitude, longitude) locations, and build the k-d tree.
+        Every state starts with a weight of 0.0.
+        """
+        self.distances = distance_matrix(locations)
+        self._points = []
+        for lat, lon in locations:
+            lat, lon = math.radians(lat), math.radians(lon)
+            self._points.append((math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)))
+        self._nodes = []
+        self._parents = []
+        self._leaves = [-1] * len(locations)
+        self._weights = [0.0] * len(locations)
+        self._min_weights = []
+        if locations:
+            self._build(list(range(len(locations))), -1)
+
+    def _build(self, members: list[int], parent: int) -> int:
+        """Add the node containing the given states (and its subtree) to the tree, and return its index."""
+        lower = tuple(min(self._points[i][axis] for i in members) for axis in range(3))
+        upper = tuple(max(self._points[i][axis] for i in members) for axis in range(3))
+        index = len(self._nodes)
+        self._parents.append(parent)
+        self._min_weights.append(0.0)
+        if len(members) <= LEAF_SIZE:
+            self._nodes.append((lower, upper, -1, -1, members))
+            for i in members:
+                self._leaves[i] = index
+            return index
+
+        # Split the states in half along the widest axis of the box.
+        axis = max(range(3), key=lambda a: upper[a] - lower[a])
+        members = sorted(members, key=lambda i: self._points[i][axis])
+        middle = len(members) // 2
+        self._nodes.append((lower, upper, -1, -1, None))
+        left = self._build(members[:middle], index)
+        right = self._build(members[middle:], index)
+        self._nodes[index] = (lower, upper, left, right, None)
+        return index
+
+    def set_weight(self, j: int, weight: Optional[float]) -> None:
+        """Set the weight of state j, or mark it as one that cannot be chosen if weight is None.
+
+        Preconditions:
+            - weight is None or weight >= 0.0
+        """
+        new_weight = math.inf if weight is None else weight
+        if self._weights[j] == new_weight:
+            return
+        self._weights[j] = new_weight
+        node = self._leaves[j]
+        self._min_weights[node] = min(self._weights[i] for i in self._nodes[node][4])
+        node = self._parents[node]
+        while node != -1:
+            _, _, left, right, _ = self._nodes[node]
+            minimum = min(self._min_weights[left], self._min_weights[right])
+            if self._min_weights[node] == minimum:
+                return
+            self._min_weights[node] = minimum
+            node = self._parents[node]
+
+    def _min_distance(self, i: int, node: int) -> float:
+        """Return a lower bound of the distance between state i and every state in the given node."""
+        lower, upper, _, _, _ = self._nodes[node]
+        point = self._points[i]
+        chord = math.sqrt(sum(max(lower[a] - point[a], 0.0, point[a] - upper[a]) ** 2 for a in range(3)))
+        return math.degrees(2 * math.asin(min(1.0, chord / 2))) - BOUND_MARGIN
+
+    def best(self, i: int) -> list[int]:
+        """Return the states j != i with the lowest score self.distances[i, j] + (the weight of j) among the states
+        that can be chosen, in increasing order.
+        Every state with the lowest score is returned, so that ties can be broken by the caller.
+
+        >>> index = SpatialIndex([(0.0, 0.0), (0.0, 10.0), (0.0, 20.0), (0.0, -10.0)])
+        >>> index.best(0)
+        [1, 3]
+        >>> index.set_weight(1, None)
+        >>> index.best(0)
+        [3]
+        >>> index.set_weight(1, 0.0)
+        >>> index.set_weight(3, 5.0)
+        >>> index.best(0)
+        [1]
+        >>> for j in range(4):
+        ...     index.set_weight(j, None)
+        >>> index.best(0)
+        []
+        """
+        if not self._nodes or self._min_weights[0] == math.inf:
+            return []
+        best_score = math.inf
+        best = []
+        queue = [(0.0, 0)]
+        while queue:
+            bound, node = heapq.heappop(queue)
+            # Every remaining node has at least this score.
+            if bound > best_score:
+                break
+            _, _, left, right, members = self._nodes[node]
+            if members is None:
+                for child in (left, right):
+                    if self._min_weights[child] != math.inf:
+                        heapq.heappush(queue, (self._min_distance(i, child) + self._min_weights[child], child))
+                continue
+            for j in members:
+                if j == i:
+                    continue
+                score = self.distances[i, j] + self._weights[j]
+                if score < best_score:
+                    best_score = score
+                    best = [j]
+                elif score == best_score and score != math.inf:
+                    best.append(j)
+        return sorted(best)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['heapq', 'math', 'numpy'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998']
+    })
@@ -0,0 +1,204 @@
+"""CSC111 Winter 2023 Course Project: Policy Sweep
+
+Instructions
+===============================
+
+This Python module contains the functions for evaluating many policy settings at once.
+A policy setting (a point of the sweep) is a dictionary in the same format as returned by
+simulations.get_user_input, mapping state names to their isolation index, maskwearing index,
+vaccination index and lockdown status. policy_grid builds every combination of the given values,
+either for all states or for some states, and run_sweep runs every point with the same replicate seeds
+in a pool of worker processes.
+
+Every replicate result is cached on disk, keyed by the content of the dataset, the policy setting,
+the engine, the seed and the model constants. So running the same or an overlapping sweep again only
+simulates the points that have not been simulated before.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+import graph
+import simulations
+import sir_model
+from ensemble import ReplicateResult, replicate_seeds, run_replicate
+
+# The default folder for the cached results
+CACHE_DIR = '.sweep_cache'
+# Change this value when the simulation changes in a way that makes the cached results invalid
+CACHE_VERSION = 2
+
+
+def policy_grid(state_names: list[str], isolation: tuple[float, ...] = (1.0,),
+                maskwearing: tuple[float, ...] = (1.0,), vaccination: tuple[float, ...] = (1.0,),
+                lockdown: tuple[bool, ...] = (False,)) -> list[dict[str, list]]:
+    """Return every combination of the given isolation, maskwearing, vaccination indices and lockdown status,
+    each applied to all the given states.
+    To vary the policy of each state separately, combine the grids of single states with combine_grids.
+
+    Preconditions:
+        - all(1.0 <= x <= 10.0 for x in isolation + maskwearing + vaccination)
+
+    >>> points = policy_grid(['Alaska', 'Arizona'], isolation=(1.0, 5.0), lockdown=(False, True))
+    >>> len(points)
+    4
+    >>> points[1]
+    {'Alaska': [1.0, 1.0, 1.0, True], 'Arizona': [1.0, 1.0, 1.0, True]}
+    """
+    return [{name: [iso, mask, vac, lock] for name in state_names}
+            for iso, mask, vac, lock in itertools.product(isolation, maskwearing, vaccination, lockdown)]
+
+
+def combine_grids(*grids: list[dict[str, list]]) -> list[dict[str, list]]:
+    """Return every combination of one point from each of the given grids, merged into one point.
+    If a state is in several grids, the value from the last grid is used.
+
+    >>> alaska = policy_grid(['Alaska'], lockdown=(False, True))
+    >>> arizona = policy_grid(['Arizona'], vaccination=(1.0, 10.0))
+    >>> len(combine_grids(alaska, arizona))
+    4
+    """
+    points = []
+    for combination in itertools.product(*grids):
+        point = {}
+        for part in combination:
+            point.update(part)
+        points.append(point)
+    return points
+
+
+def dataset_hash(dataset: str) -> str:
+    """Return the SHA-256 hash of the content of the given dataset file."""
+    with open(dataset, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def cache_key(data_hash: str, policies: dict[str, list], engine: str, seed: int) -> str:
+    """Return the name of the cache file of the replicate with the given seed and policies.
+    The key also contains the model constants, so changing them does not reuse old results.
+
+    >>> cache_key('abc', {'Alaska': [1.0, 1.0, 1.0, False]}, 'count', 1) == \
+    cache_key('abc', {'Alaska': [1, 1, 1, False]}, 'count', 1)
+    True
+    """
+    content = json.dumps({
+        'version': CACHE_VERSION,
+        'dataset': data_hash,
+        'policies': {name: [float(v) for v in values[:3]] + [bool(values[3])] for name, values in policies.items()},
+        'engine': engine,
+        'seed': seed,
+        'constants': [simulations.RATE_OF_REMOVAL, simulations.RATE_OF_CONTACT,
+                      graph.TRANSMIT_THRESHOLD, sir_model.INFECTIOUS_PERIOD]
+    }, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest() + '.npz'
+
+
+def run_sweep(dataset: str, points: list[dict[str, list]], replicates: int = 1, seed: Optional[int] = None,
+              engine: str = 'count', cache_dir: Optional[str] = CACHE_DIR,
+              max_workers: Optional[int] = None) -> list[list[ReplicateResult]]:
+    """Run the given number of replicates for every policy setting in points, and return the results
+    of every point in the same order as points.
+    Every point uses the same replicate seeds, so the differences between points are due to the policies.
+    The results found in cache_dir are loaded instead of simulated, and the new results are saved there.
+    No cache is used if cache_dir is None.
+    The replicates are run in a pool of max_workers processes (the number of CPUs if None),
+    or in this process if max_workers is 1.
+
+    Preconditions:
+        - dataset is a valid path to the file
+        - replicates >= 0
+
+    >>> points = policy_grid(['Alaska', 'Arizona', 'Arkansas'], lockdown=(False, True))
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     first = run_sweep('data/states_small.csv', points, 2, seed=0, cache_dir=folder, max_workers=1)
+    ...     again = run_sweep('data/states_small.csv', points, 2, seed=0, cache_dir=folder, max_workers=1)
+    ...     len(os.listdir(folder))
+    4
+    >>> [r.days for r in first[1]] == [r.days for r in again[1]]
+    True
+    """
+    seeds = replicate_seeds(seed, replicates)
+    data_hash = dataset_hash(dataset)
+    results = [[None] * replicates for _ in points]
+
+    # Load the cached results, and collect the replicates that still need to be simulated.
+    missing = []
+    for i, point in enumerate(points):
+        for j, replicate_seed in enumerate(seeds):
+            path = None
+            if cache_dir is not None:
+                path = os.path.join(cache_dir, cache_key(data_hash, point, engine, replicate_seed))
+            if path is not None and os.path.exists(path):
+                results[i][j] = load_result(path)
+            else:
+                missing.append((i, j, path))
+
+    if missing:
+        args = ([dataset] * len(missing), [seeds[j] for _, j, _ in missing], [engine] * len(missing),
+                [points[i] for i, _, _ in missing])
+        if max_workers == 1:
+            _collect(results, missing, map(run_replicate, *args), cache_dir)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                _collect(results, missing, executor.map(run_replicate, *args), cache_dir)
+    return results
+
+
+def _collect(results: list[list[Optional[ReplicateResult]]], missing: list[tuple[int, int, Optional[str]]],
+             new_results: Iterable[ReplicateResult], cache_dir: Optional[str]) -> None:
+    """Store every new result in results and save it in the cache, in the order they are produced."""
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    for (i, j, path), result in zip(missing, new_results):
+        results[i][j] = result
+        if path is not None:
+            save_result(path, result)
+
+
+def save_result(path: str, result: ReplicateResult) -> None:
+    """Save the given result to the given path as a compressed NPZ file.
+    The file is written under a temporary name first, so other sweeps never read a partial file.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        np.savez_compressed(file, **result._asdict())
+    os.replace(temp_path, path)
+
+
+def load_result(path: str) -> ReplicateResult:
+    """Return the result saved in the given path by save_result."""
+    with np.load(path) as data:
+        return ReplicateResult(seed=int(data['seed']), first_state=int(data['first_state']),
+                               days=int(data['days']), final=data['final'], infected=data['infected'],
+                               edges=data['edges'])
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['hashlib', 'itertools', 'json', 'os', 'tempfile', 'collections.abc', 'concurrent.futures',
+                          'numpy', 'graph', 'simulations', 'sir_model', 'ensemble'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998', 'R0914']
+    })
@@ -0,0 +1,327 @@
+"""CSC111 Winter 2023 Course Project: Vectorized Simulation
+
+Instructions
+===============================
+
+This Python module contains VectorizedZones, a batched version of the InfectedZones simulation.
+Instead of running one State's infection process after another, it stores the number of
+susceptible people, the infective people grouped by the days they have been infected
+(the same histogram as InfectiveCount), and the number of removed people of all states in NumPy arrays.
+Every simulated day advances all states at once with a few array operations, so datasets with
+many states (or counties) do not need one Python loop per state.
+
+All states share one day clock: a state infected by another state starts its infection process
+on the next day, instead of running to completion before the infecting state continues.
+
+VectorizedZones has two modes. In the 'ceil' mode, the numbers of newly infected and removed people
+are ceil(r * I * S) and ceil(a * I') every day, exactly as in State.infection_process.
+In the 'binomial' mode (tau-leaping), they are drawn from binomial distributions with the same means,
+so every run is different like the agent-based model, while a day still costs the same no matter how large
+the population is.
+In the 'mean_field' mode, the numbers are not rounded, so the simulation is the deterministic difference system
+of our SIR model, still with the 14-day recovery delay. Randomness in spreading is replaced by its mean:
+a state under lockdown tries to infect another state on every 10th day it is able to, and ties between
+the next states to infect are broken by the order of the states. It is meant for quickly screening
+parameters on full populations before running the slower random modes.
+
+Copyright and Usage Information
+===============================
+
+This file is provided solely for the personal and private use of instructors and TAs of
+CSC111 at the University of Toronto St. George campus. All forms of
+distribution of this code, whether as given or with any changes, are
+expressly prohibited. :)
+
+This file is Copyright (c) 2023 Marshal Guo, Yibin Cui, Zherui Zhang.
+"""
+from __future__ import annotations
+from typing import Optional
+
+import numpy as np
+
+from graph import State, TRANSMIT_THRESHOLD
+from sir_model import INFECTIOUS_PERIOD
+from spatial import distance_matrix
+from recorder import Recorder
+from edges import EdgeStore
+
+# Score added to a state under lockdown when choosing the next state to infect, as in State.compute_state_score
+LOCKDOWN_SCORE = 50
+# Probability for a state under lockdown to try infecting another state on a day, as in State.infection_process
+LOCKDOWN_SPREAD_PROBABILITY = 0.1
+# The ways to compute the number of newly infected and removed people every day
+MODES = ('ceil', 'binomial', 'mean_field')
+# In the 'mean_field' mode, a state's infection process finishes when it has fewer infective people than this,
+# and the remaining fraction of infective people is removed.
+MEAN_FIELD_EXTINCTION = 0.5
+
+
+class VectorizedZones:
+    """A graph representing the infected zones in the US, where all states are simulated together.
+
+    Instance Attributes
+    - names: the names of all states, state i is the i-th state in all the arrays below
+    - sus: the number of susceptible people in each state
+    - inf: inf[i, d] is the number of people in state i that have been infected for d days,
+           and inf[i, INFECTIOUS_PERIOD + 1] is the number of recoverable people in state i
+    - rem: the number of removed people in each state
+    - a: rate of removal of each state
+    - r: rate of contact of each state
+    - lockdown: whether each state is under lockdown
+    - distances: distances[i, j] is the great-circle distance between state i and state j, as in State.get_distance
+    - infected: whether each state has been infected
+    - started: whether each state's infection process has started (State.during_infection)
+    - finished: whether each state's infection process has finished
+    - day: the number of days simulated
+    - mode: how the number of newly infected and removed people is computed, one of MODES
+    - recorder: the Recorder of the per-day numbers of every running state and the spread events,
+      or None if the simulation is not recorded
+    - edges: the connections between the infected states, as in InfectedZones.edges
+
+    Private Instance Attributes
+    - _all_states: A dictionary mapping each state's name to its corresponding State object.
+    - _index: A dictionary mapping each state's name to its index.
+    - _rng: The random number generator of this simulation.
+    - _lockdown_days: The number of days each state under lockdown has been able to infect another state,
+      only used in the 'mean_field' mode.
+
+    Representation Invariants:
+    - len(self.names) == len(self.sus) == len(self.inf) == len(self.rem)
+    - self.inf.shape[1] == INFECTIOUS_PERIOD + 2
+    - all(self.started[i] for i in range(len(self.names)) if self.finished[i])
+    """
+    names: list[str]
+    sus: np.ndarray
+    inf: np.ndarray
+    rem: np.ndarray
+    a: np.ndarray
+    r: np.ndarray
+    lockdown: np.ndarray
+    distances: np.ndarray
+    infected: np.ndarray
+    started: np.ndarray
+    finished: np.ndarray
+    day: int
+    mode: str
+    recorder: Optional[Recorder]
+    edges: EdgeStore
+    _all_states: dict[str, State]
+    _index: dict[str, int]
+    _rng: np.random.Generator
+    _lockdown_days: np.ndarray
+
+    def __init__(self, all_states: dict[str, State], state_names: list[str], seed: Optional[int] = None,
+                 mode: str = 'ceil', recorder: Optional[Recorder] = None) -> None:
+        """Initialize the arrays from the given states, using each state's current number of susceptible
+        and removed people, and its a, r and lockdown, so policies set with InfectedZones.change_a_and_r
+        and InfectedZones.movement_prohibited are kept.
+        If recorder is given, the simulation is recorded in it, and it must be fractional in the 'mean_field' mode.
+
+        Raise a ValueError if mode is not in MODES.
+
+        Preconditions:
+            - set(all_states.keys()) == set(state_names)
+            - no state has any infective people
+        """
+        if mode not in MODES:
+            raise ValueError
+        self.mode = mode
+        self.recorder = recorder
+        n = len(state_names)
+        self.names = list(state_names)
+        self._all_states = all_states
+        self._index = {name: i for i, name in enumerate(state_names)}
+        states = [all_states[name] for name in state_names]
+
+        # The numbers of people are fractional in the 'mean_field' mode.
+        dtype = np.float64 if mode == 'mean_field' else np.int64
+        self.sus = np.array([len(s.sus) for s in states], dtype=dtype)
+        self.inf = np.zeros((n, INFECTIOUS_PERIOD + 2), dtype=dtype)
+        self.rem = np.array([len(s.rem) for s in states], dtype=dtype)
+        self.a = np.array([s.a for s in states], dtype=np.float64)
+        self.r = np.array([s.r for s in states], dtype=np.float64)
+        self.lockdown = np.array([s.lockdown for s in states], dtype=bool)
+        self.distances = distance_matrix([s.location for s in states])
+
+        self.infected = np.zeros(n, dtype=bool)
+        self.started = np.zeros(n, dtype=bool)
+        self.finished = np.zeros(n, dtype=bool)
+        self.day = 0
+        self.edges = EdgeStore()
+        self._rng = np.random.default_rng(seed)
+        self._lockdown_days = np.zeros(n, dtype=np.int64)
+
+    def __repr__(self) -> str:
+        """Return a string representing the current numbers of every state."""
+        totals = self.inf.sum(axis=1)
+        return '\n'.join(f'{name}: S={self.sus[i]}, I={totals[i]}, R={self.rem[i]}'
+                         for i, name in enumerate(self.names))
+
+    def add_state(self, state: State) -> None:
+        """Infect the given state with a patient zero, then simulate until every infection process finishes.
+
+        Preconditions:
+            - state.name in self.names
+
+        >>> from simulations import populate_states
+        >>> states, keys = populate_states('data/states_small.csv', engine='count')
+        >>> zones = VectorizedZones(states, keys, seed=0)
+        >>> zones.add_state(states['Arkansas'])
+        >>> int(zones.sus.sum() + zones.inf.sum() + zones.rem.sum())
+        2450
+        >>> bool(zones.finished[keys.index('Arkansas')])
+        True
+        >>> states, keys = populate_states('data/states_small.csv', engine='count')
+        >>> zones = VectorizedZones(states, keys, seed=0, mode='binomial')
+        >>> zones.add_state(states['Arkansas'])
+        >>> int(zones.get_numbers().sum())
+        2450
+        >>> states, keys = populate_states('data/states_full.csv', engine='count')
+        >>> zones = VectorizedZones(states, keys, mode='mean_field')
+        >>> zones.add_state(states['Ohio'])
+        >>> round(float(zones.get_numbers().sum()))
+        328032421
+        >>> bool(zones.finished.all())
+        True
+        """
+        self.seed_state(state.name)
+        self.run()
+
+    def seed_state(self, state_name: str) -> None:
+        """Mark the given state as infected and move one susceptible person to its infective group,
+        like InfectedZones.add_state. The state's infection process starts on the next simulated day.
+        """
+        i = self._index[state_name]
+        self.infected[i] = True
+        if self.sus[i] < 1:
+            return
+        self.sus[i] -= 1
+        self.inf[i, 0] += 1
+        self.started[i] = True
+
+    def run(self, max_days: Optional[int] = None) -> None:
+        """Simulate until no infection process is running, or until max_days more days are simulated."""
+        end = None if max_days is None else self.day + max_days
+        while (end is None or self.day < end) and self.step():
+            pass
+
+    def step(self) -> bool:
+        """Simulate one day for every state whose infection process is running.
+        Return whether any infection process was running on this day.
+        """
+        inf_total = self.inf.sum(axis=1)
+        if self.mode == 'mean_field':
+            ending = self.started & ~self.finished & (inf_total < MEAN_FIELD_EXTINCTION)
+            self.rem[ending] += inf_total[ending]
+            self.inf[ending] = 0
+            inf_total[ending] = 0
+        # A state's infection process finishes once it has no infective people.
+        self.finished |= self.started & (inf_total == 0)
+        running = self.started & ~self.finished
+        if not running.any():
+            return False
+
+        # Calculation of the number of sick and recovered people according to the SIR model.
+        new_infected = np.where(running, self._draw(self.r * inf_total * self.sus, self.sus), 0)
+        self.sus -= new_infected
+        self.inf[:, 0] += new_infected
+        inf_total += new_infected
+
+        recoverable = self.inf[:, -1]
+        new_removed = np.where(running, self._draw(self.a * recoverable, recoverable), 0)
+        self.inf[:, -1] -= new_removed
+        self.rem += new_removed
+        inf_total -= new_removed
+
+        # Only states with more than TRANSMIT_THRESHOLD infective people can infect another state,
+        # and a state under lockdown only tries with a small probability.
+        spreading = running & (inf_total > TRANSMIT_THRESHOLD)
+        if self.mode == 'mean_field':
+            self._lockdown_days += spreading & self.lockdown
+            period = round(1 / LOCKDOWN_SPREAD_PROBABILITY)
+            spreading &= ~self.lockdown | (self._lockdown_days % period == 0)
+        else:
+            spreading &= ~self.lockdown | (self._rng.random(len(self.names)) < LOCKDOWN_SPREAD_PROBABILITY)
+
+        # For infected people, add their infected time by one.
+        self.inf[running, -1] += self.inf[running, -2]
+        self.inf[running, 1:-1] = self.inf[running, :-2]
+        self.inf[running, 0] = 0
+
+        if self.recorder is not None:
+            states = np.flatnonzero(running)
+            self.recorder.record_days(self.day, states, self.sus[states], inf_total[states], self.rem[states],
+                                      new_infected[states], new_removed[states])
+
+        for i in np.flatnonzero(spreading):
+            self._infect_next_state(i)
+
+        self.day += 1
+        return True
+
+    def _draw(self, rate: np.ndarray, available: np.ndarray) -> np.ndarray:
+        """Return the number of people moving out of a group of each state, given the rates of the SIR model
+        (r * I * S or a * I') and the numbers of people available in the group.
+
+        In the 'ceil' mode, the rates are rounded up as in State.infection_process, at most all available people.
+        In the 'binomial' mode, each available person moves with probability ceil(rate) / available,
+        so the mean of the result is the same as in the 'ceil' mode.
+        In the 'mean_field' mode, the rates are used without rounding.
+        """
+        if self.mode == 'mean_field':
+            return np.minimum(rate, available)
+        expected = np.ceil(rate)
+        if self.mode == 'binomial':
+            probability = np.minimum(expected / np.maximum(available, 1), 1.0)
+            return self._rng.binomial(available, probability)
+        return np.minimum(expected.astype(np.int64), available)
+
+    def _infect_next_state(self, i: int) -> None:
+        """Let state i infect the next state, chosen as in State.infect_next_state."""
+        candidates = self.sus >= 1
+        candidates[i] = False
+        if not candidates.any():
+            return
+
+        inf_score = self.inf.sum(axis=1) / np.maximum(self.sus, 1)
+        scores = np.where(candidates, self.distances[i] + (LOCKDOWN_SCORE * self.lockdown + inf_score), np.inf)
+        candidates = scores == scores.min()
+        distances = np.where(candidates, self.distances[i], np.inf)
+        finalists = np.flatnonzero(distances == distances.min())
+
+        if len(finalists) == 1 or self.mode == 'mean_field':
+            j = int(finalists[0])
+        else:
+            j = int(self._rng.choice(finalists))
+        self.seed_state(self.names[j])
+        if self.recorder is not None:
+            self.recorder.record_spread(self.day, int(i), j)
+        self.edges.add(self.day, self.names[i], self.names[j])
+
+    def get_numbers(self) -> np.ndarray:
+        """Return an array of shape (number of states, 3), where each row is the current number of
+        susceptible, infective and removed people of the state.
+        """
+        return np.stack([self.sus, self.inf.sum(axis=1), self.rem], axis=1)
+
+    def get_infected_states(self) -> dict[str, State]:
+        """Return a dictionary mapping each infected state's name to State."""
+        return {name: self._all_states[name] for i, name in enumerate(self.names) if self.infected[i]}
+
+    def get_state_connections(self) -> list[set[str]]:
+        """Return a list of all connected states, each pair is represented by a set containing the two
+        connected states' name, like InfectedZones.get_state_connections.
+        """
+        return [set(pair) for pair in self.edges.pairs()]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['numpy', 'graph', 'sir_model', 'simulations', 'spatial', 'recorder', 'edges'],
+        'disable': ['W0622', 'E9999', 'R0902', 'R0913', 'E9998']
+    })